@@ -0,0 +1,80 @@
+import os
+import json
+import shutil
+
+REQUIRED_ENTRY_FIELDS = ('google_drive_url', 'filename', 'model_type')
+
+class ManifestError(ValueError):
+    """Raised for a malformed batch manifest"""
+
+
+def parse_manifest(data):
+    """Turn a batch request body into a list of entry dicts.
+
+    Accepts ``{"items": [...]}``, a bare list, or ``{"manifest": "<text>",
+    "format": "json" | "yaml"}`` carrying the contents of a manifest file.
+    A manifest document may itself be a list or hold one under ``items``
+    (or ``models``).
+    """
+    if isinstance(data, dict) and 'manifest' in data:
+        text = data['manifest']
+        fmt = (data.get('format') or 'json').lower()
+        if fmt in ('yaml', 'yml'):
+            try:
+                import yaml
+            except ImportError:
+                raise ManifestError("YAML manifests need PyYAML installed")
+            try:
+                data = yaml.safe_load(text)
+            except yaml.YAMLError as e:
+                raise ManifestError(f"Invalid YAML manifest: {e}")
+        else:
+            try:
+                data = json.loads(text)
+            except ValueError as e:
+                raise ManifestError(f"Invalid JSON manifest: {e}")
+
+    if isinstance(data, dict):
+        data = data.get('items', data.get('models'))
+    if not isinstance(data, list) or not data:
+        raise ManifestError("Manifest must contain a non-empty list of entries")
+
+    entries = []
+    for index, entry in enumerate(data):
+        if not isinstance(entry, dict):
+            raise ManifestError(f"Entry {index} is not an object")
+        missing = [field for field in REQUIRED_ENTRY_FIELDS if not entry.get(field)]
+        if missing:
+            raise ManifestError(f"Entry {index} is missing: {', '.join(missing)}")
+        entries.append({
+            'google_drive_url': entry['google_drive_url'],
+            'filename': entry['filename'],
+            'model_type': entry['model_type'],
+            'custom_path': entry.get('custom_path', ''),
+            'sha256': (entry.get('sha256') or '').lower() or None,
+        })
+    return entries
+
+
+def order_by_size(items):
+    """Smallest first so many small models land early; unknown sizes go last"""
+    return sorted(items, key=lambda item: (item['size'] is None, item['size'] or 0))
+
+
+def check_free_space(items):
+    """Return a list of shortfall messages for filesystems that cannot hold their planned downloads"""
+    needed = {}
+    for item in items:
+        if not item['size']:
+            continue
+        directory = os.path.dirname(item['path'])
+        device = os.stat(directory).st_dev
+        total, first_dir = needed.get(device, (0, directory))
+        needed[device] = (total + item['size'], first_dir)
+
+    shortfalls = []
+    for total, directory in needed.values():
+        free = shutil.disk_usage(directory).free
+        if total > free:
+            shortfalls.append(f"{directory}: need {total} bytes, {free} free")
+    return shortfalls
@@ -0,0 +1,202 @@
+"""Local stand-in for Google Drive's download endpoints, used by the offline benchmarks.
+
+Files are registered with the behaviour to reproduce: served directly by
+``uc?export=download``, behind the virus-scan "Download anyway" form,
+throttled, stalling part-way, or without Range support. Payloads are built
+on disk, sparse where the format allows, so multi-GB cases cost little
+space on the serving side.
+"""
+import os
+import re
+import json
+import struct
+import pickle
+import asyncio
+import zipfile
+from aiohttp import web
+
+CHUNK_SIZE = 1024 * 1024
+
+CONFIRM_PAGE = """<!DOCTYPE html><html><head><title>Google Drive - Virus scan warning</title></head>
+<body><p>{name} is too large for Google to scan for viruses.</p>
+<form id="download-form" action="/download" method="get">
+<input type="submit" id="uc-download-link" class="goog-inline-block jfk-button jfk-button-action" value="Download anyway"/>
+<input type="hidden" name="id" value="{file_id}">
+<input type="hidden" name="export" value="download">
+<input type="hidden" name="confirm" value="t">
+<input type="hidden" name="uuid" value="bench-{file_id}">
+</form></body></html>"""
+
+
+class StubFile:
+    """A file the stand-in serves, and how it misbehaves.
+
+    ``rate`` throttles each connection to that many bytes per second.
+    ``stall_after`` makes the first response reaching that offset stop
+    sending, for ``stall_seconds`` or until the client gives up if None;
+    later requests are served normally so resuming can be measured.
+    """
+
+    def __init__(self, file_id, path, name, confirm=False, rate=None, stall_after=None, stall_seconds=None, ranges=True):
+        self.file_id = file_id
+        self.path = path
+        self.name = name
+        self.confirm = confirm
+        self.rate = rate
+        self.stall_after = stall_after
+        self.stall_seconds = stall_seconds
+        self.ranges = ranges
+        self.stalled = False
+        self.requests = 0
+
+    @classmethod
+    def from_dict(cls, spec):
+        return cls(**spec)
+
+
+class DriveStub:
+    def __init__(self, files):
+        self.files = {stub.file_id: stub for stub in files}
+
+    def make_app(self):
+        app = web.Application()
+        app.router.add_get("/uc", self.handle_uc)
+        app.router.add_get("/download", self.handle_download)
+        return app
+
+    def lookup(self, request):
+        stub = self.files.get(request.query.get("id", ""))
+        if stub is None:
+            raise web.HTTPNotFound(text="<html><body>Sorry, the file you have requested does not exist.</body></html>",
+                                   content_type="text/html")
+        return stub
+
+    async def handle_uc(self, request):
+        stub = self.lookup(request)
+        if stub.confirm and "confirm" not in request.query:
+            return web.Response(text=CONFIRM_PAGE.format(name=stub.name, file_id=stub.file_id), content_type="text/html")
+        return await self.serve(request, stub)
+
+    async def handle_download(self, request):
+        return await self.serve(request, self.lookup(request))
+
+    async def serve(self, request, stub):
+        stub.requests += 1
+        size = os.path.getsize(stub.path)
+        etag = f'"{stub.file_id}-{size}"'
+        headers = {
+            "Content-Type": "application/octet-stream",
+            "Content-Disposition": f'attachment; filename="{stub.name}"',
+            "ETag": etag,
+        }
+        if stub.ranges:
+            headers["Accept-Ranges"] = "bytes"
+
+        start, end, status = 0, size - 1, 200
+        range_header = request.headers.get("Range")
+        if range_header and stub.ranges and request.headers.get("If-Range", etag) == etag:
+            match = re.fullmatch(r"bytes=(\d+)-(\d*)", range_header.strip())
+            if match:
+                start = int(match.group(1))
+                end = min(int(match.group(2)), size - 1) if match.group(2) else size - 1
+                if start > end:
+                    raise web.HTTPRequestRangeNotSatisfiable(headers={"Content-Range": f"bytes */{size}"})
+                status = 206
+                headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+
+        response = web.StreamResponse(status=status, headers=headers)
+        response.content_length = end - start + 1
+        await response.prepare(request)
+        try:
+            with open(stub.path, "rb") as f:
+                f.seek(start)
+                offset = start
+                while offset <= end:
+                    chunk = f.read(min(CHUNK_SIZE, end - offset + 1))
+                    if stub.stall_after is not None and not stub.stalled and offset + len(chunk) > stub.stall_after:
+                        stub.stalled = True
+                        keep = max(0, stub.stall_after - offset)
+                        await response.write(chunk[:keep])
+                        await asyncio.sleep(stub.stall_seconds if stub.stall_seconds is not None else 3600)
+                        chunk, offset = chunk[keep:], offset + keep
+                    await response.write(chunk)
+                    offset += len(chunk)
+                    if stub.rate:
+                        await asyncio.sleep(len(chunk) / stub.rate)
+            await response.write_eof()
+        except (ConnectionError, asyncio.CancelledError):
+            # The client hung up: stall detection giving up, or segment 0 of a parallel download done
+            pass
+        return response
+
+
+def run_server(specs, port, ready=None):
+    """Serve ``specs`` (StubFile keyword dicts) on 127.0.0.1:``port`` until the process is killed"""
+    stub = DriveStub([StubFile.from_dict(spec) for spec in specs])
+
+    async def main():
+        runner = web.AppRunner(stub.make_app(), access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, "127.0.0.1", port).start()
+        if ready is not None:
+            ready.set()
+        await asyncio.Event().wait()
+
+    asyncio.run(main())
+
+
+def _write_zeros(f, size):
+    block = bytes(CHUNK_SIZE)
+    remaining = size
+    while remaining:
+        n = min(remaining, CHUNK_SIZE)
+        f.write(block[:n])
+        remaining -= n
+
+
+def make_sparse_file(path, size):
+    """All-zero file that takes no space on filesystems with sparse file support"""
+    with open(path, "wb") as f:
+        f.truncate(size)
+
+
+def make_safetensors(path, size):
+    """Valid safetensors file of about ``size`` bytes with one F32 tensor, sparse"""
+    data_size = max(4, size // 4 * 4)
+    header = json.dumps({"weight": {"dtype": "F32", "shape": [data_size // 4], "data_offsets": [0, data_size]}}).encode()
+    header += b" " * (-len(header) % 8)
+    with open(path, "wb") as f:
+        f.write(struct.pack("<Q", len(header)))
+        f.write(header)
+        f.truncate(8 + len(header) + data_size)
+
+
+class _StoragePickler(pickle.Pickler):
+    """Pickles a state dict whose tensors are references to storages, as torch.save does"""
+
+    def persistent_id(self, obj):
+        if isinstance(obj, tuple) and obj and obj[0] == "storage":
+            return obj
+        return None
+
+
+def make_torch_checkpoint(path, size):
+    """Zip-format torch checkpoint with one storage of about ``size`` bytes (written out, zips cannot be sparse)"""
+    state = {"weight": ("storage", "FloatStorage", "0", "cpu", max(1, size // 4))}
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_STORED, allowZip64=True) as archive:
+        with archive.open("archive/data.pkl", "w") as f:
+            _StoragePickler(f, protocol=2).dump(state)
+        archive.writestr("archive/version", "3\n")
+        with archive.open("archive/data/0", "w", force_zip64=True) as f:
+            _write_zeros(f, max(4, size // 4 * 4))
+
+
+def make_zip(path, member_name, member_path):
+    """Single-member stored zip, the way a model is often shared on Drive"""
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_STORED, allowZip64=True) as archive:
+        with open(member_path, "rb") as src, archive.open(member_name, "w", force_zip64=True) as dst:
+            while True:
+                chunk = src.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                dst.write(chunk)
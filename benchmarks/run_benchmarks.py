@@ -0,0 +1,317 @@
+"""Offline benchmarks for the Google Drive downloader.
+
+Runs GoogleDriveDownloaderAPI against a local Drive stand-in (drive_stub.py)
+and reports, per case: wall time, peak RSS, bytes written to disk and how
+long the event loop was blocked. Each case runs in a fresh process so peak
+RSS is per case, and the stand-in runs in its own process so it does not
+skew the measurements.
+
+    python benchmarks/run_benchmarks.py             # quick suite, KB to a few hundred MB
+    python benchmarks/run_benchmarks.py --full      # adds multi-GB (sparse) cases
+    python benchmarks/run_benchmarks.py --only zip --json results.json
+
+Served payloads are cached in the work directory between runs. Downloaded
+copies are written out in full and deleted after each case, so the full
+suite needs free space for its largest case.
+"""
+import os
+import sys
+import json
+import time
+import socket
+import asyncio
+import argparse
+import tempfile
+import importlib.util
+import multiprocessing
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+REPO_DIR = BENCH_DIR.parent
+sys.path.insert(0, str(BENCH_DIR))
+
+import drive_stub
+
+KiB = 1024
+MiB = 1024 * KiB
+GiB = 1024 * MiB
+
+PAYLOADS = {
+    # kind: (served file name, name the download is saved under, builder)
+    "bin": ("payload.bin", "payload.bin", drive_stub.make_sparse_file),
+    "pth": ("model.pth", "model.pth", drive_stub.make_torch_checkpoint),
+    "safetensors": ("model.safetensors", "model.safetensors", drive_stub.make_safetensors),
+    "zip-pth": ("model.zip", "model.pth", None),
+}
+
+
+class Case:
+    def __init__(self, name, kind, size, full_only=False, stall_timeout=60, **behaviour):
+        self.name = name
+        self.kind = kind
+        self.size = size
+        self.full_only = full_only
+        self.stall_timeout = stall_timeout
+        self.behaviour = behaviour
+
+    @property
+    def file_id(self):
+        # Long enough to pass for a bare Drive file ID
+        return f"bench_{self.name}".replace('.', '_').ljust(33, '0')
+
+
+CASES = [
+    Case("direct-64k", "bin", 64 * KiB),
+    Case("direct-16m", "bin", 16 * MiB),
+    Case("confirm-256m", "bin", 256 * MiB, confirm=True),
+    Case("no-ranges-64m", "bin", 64 * MiB, ranges=False),
+    Case("slow-8m", "bin", 8 * MiB, rate=2 * MiB),
+    Case("stall-resume-64m", "bin", 64 * MiB, stall_timeout=3, stall_after=24 * MiB),
+    Case("pth-64m", "pth", 64 * MiB),
+    Case("zip-pth-64m", "zip-pth", 64 * MiB),
+    Case("safetensors-256m", "safetensors", 256 * MiB, confirm=True),
+    Case("confirm-2g", "bin", 2 * GiB, full_only=True, confirm=True),
+    Case("safetensors-4g", "safetensors", 4 * GiB, full_only=True, confirm=True),
+    Case("zip-pth-1g", "zip-pth", 1 * GiB, full_only=True),
+]
+
+
+def build_payload(case, served_dir):
+    """Create (or reuse) the file the stand-in serves for ``case``"""
+    served_name, _, builder = PAYLOADS[case.kind]
+    path = served_dir / f"{case.kind}-{case.size}-{served_name}"
+    if path.exists():
+        return path
+    partial = path.with_name(path.name + ".building")
+    if case.kind == "zip-pth":
+        member = served_dir / f"pth-{case.size}-model.pth"
+        if not member.exists():
+            drive_stub.make_torch_checkpoint(member, case.size)
+        drive_stub.make_zip(partial, "model.pth", member)
+    else:
+        builder(partial, case.size)
+    os.replace(partial, path)
+    return path
+
+
+class LoopMonitor:
+    """Measures event loop blocking: a ticker that should wake every ``interval`` records how late it is"""
+
+    def __init__(self, interval=0.01, threshold=0.005):
+        self.interval = interval
+        self.threshold = threshold
+        self.blocked = 0.0
+        self.max_lag = 0.0
+        self.stalls = 0
+        self._task = None
+
+    async def _tick(self):
+        while True:
+            before = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            lag = time.perf_counter() - before - self.interval
+            if lag > self.threshold:
+                self.blocked += lag
+                self.stalls += 1
+            self.max_lag = max(self.max_lag, lag)
+
+    def start(self):
+        self._task = asyncio.ensure_future(self._tick())
+
+    async def stop(self):
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+
+
+def peak_rss():
+    """Peak resident set size of this process in bytes, or None where unavailable"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def io_counters():
+    """(bytes sent to storage, bytes passed to write calls) for this process, or Nones"""
+    try:
+        with open("/proc/self/io") as f:
+            fields = dict(line.split(": ") for line in f.read().splitlines())
+        return int(fields["write_bytes"]), int(fields["wchar"])
+    except OSError:
+        pass
+    try:
+        import psutil
+        counters = psutil.Process().io_counters()
+        return counters.write_bytes, None
+    except (ImportError, AttributeError):
+        return None, None
+
+
+def load_downloader():
+    """Import the node package with the ComfyUI shims standing in for folder_paths and server"""
+    sys.path.insert(0, str(BENCH_DIR / "shims"))
+    spec = importlib.util.spec_from_file_location(
+        "gdrive_downloader", REPO_DIR / "__init__.py", submodule_search_locations=[str(REPO_DIR)]
+    )
+    package = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = package
+    spec.loader.exec_module(package)
+    return importlib.import_module("gdrive_downloader.google_drive_downloader")
+
+
+def run_case(case, port, work_dir, results):
+    """Child process: download one case and put its measurements on ``results``"""
+    dest_dir = work_dir / "models" / case.name
+    dest_dir.mkdir(parents=True, exist_ok=True)
+
+    async def main():
+        monitor = LoopMonitor()
+        rss_before = peak_rss()
+        written_before, wchar_before = io_counters()
+        monitor.start()
+        started = time.perf_counter()
+        result = await api.download_file_async(
+            google_drive_url=case.file_id,
+            filename=PAYLOADS[case.kind][1],
+            model_type="custom",
+            custom_path=str(dest_dir),
+            overwrite=True,
+            include_timings=True
+        )
+        wall = time.perf_counter() - started
+        await monitor.stop()
+        written_after, wchar_after = io_counters()
+        await api.http_downloader.close()
+        return {
+            "case": case.name,
+            "size": case.size,
+            "success": bool(result.get("success")),
+            "error": result.get("error"),
+            "message": result.get("message"),
+            "wall_seconds": wall,
+            "throughput_mib_s": case.size / wall / MiB if wall else None,
+            "rss_baseline_bytes": rss_before,
+            "rss_peak_bytes": peak_rss(),
+            "disk_write_bytes": written_after - written_before if written_before is not None else None,
+            "write_call_bytes": wchar_after - wchar_before if wchar_before is not None else None,
+            "loop_blocked_seconds": monitor.blocked,
+            "loop_max_lag_seconds": monitor.max_lag,
+            "loop_stalls": monitor.stalls,
+            "timings": result.get("timings"),
+        }
+
+    try:
+        os.environ["GDRIVE_BENCH_COMFYUI_BASE"] = str(work_dir / "comfyui")
+        downloader = load_downloader()
+        from gdrive_downloader.http_engine import HttpDownloader
+        from gdrive_downloader.retry import RetryPolicy
+
+        api = downloader.GoogleDriveDownloaderAPI(cache_max_bytes=0)
+        api.http_downloader = HttpDownloader(
+            download_url=f"http://127.0.0.1:{port}/uc?export=download&id={{file_id}}",
+            stall_timeout=case.stall_timeout
+        )
+        api.retry_policies["http"] = RetryPolicy(attempts=4, base_delay=0.5)
+        results.put(asyncio.run(main()))
+    except Exception as e:
+        results.put({"case": case.name, "size": case.size, "success": False, "error": f"{type(e).__name__}: {e}"})
+    finally:
+        for path in dest_dir.iterdir():
+            path.unlink()
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def format_bytes(n):
+    if n is None:
+        return "-"
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if abs(n) < 1024 or unit == "GiB":
+            return f"{n:.1f} {unit}" if unit != "B" else f"{n} B"
+        n /= 1024
+
+
+def print_table(rows):
+    header = f"{'case':<20} {'ok':<3} {'wall':>8} {'MiB/s':>8} {'peak RSS':>11} {'disk write':>11} {'loop blocked':>13} {'max lag':>8}"
+    print(header)
+    print("-" * len(header))
+    for row in rows:
+        if "wall_seconds" not in row:
+            print(f"{row['case']:<20} no  {row.get('error')}")
+            continue
+        print(
+            f"{row['case']:<20} {'yes' if row['success'] else 'no':<3} {row['wall_seconds']:>7.2f}s "
+            f"{row['throughput_mib_s'] or 0:>8.1f} {format_bytes(row['rss_peak_bytes']):>11} "
+            f"{format_bytes(row['disk_write_bytes']):>11} {row['loop_blocked_seconds'] * 1000:>11.0f}ms "
+            f"{row['loop_max_lag_seconds'] * 1000:>6.0f}ms"
+        )
+        if not row["success"]:
+            print(f"{'':<20} error: {row['error']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--full", action="store_true", help="include the multi-GB cases")
+    parser.add_argument("--only", action="append", default=[], help="run cases whose name contains this (repeatable)")
+    parser.add_argument("--work-dir", default=os.path.join(tempfile.gettempdir(), "gdrive_bench"),
+                        help="where served payloads and downloads live")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    cases = [case for case in CASES if args.full or not case.full_only]
+    if args.only:
+        cases = [case for case in cases if any(pattern in case.name for pattern in args.only)]
+    if not cases:
+        parser.error("no benchmark cases selected")
+
+    work_dir = Path(args.work_dir)
+    served_dir = work_dir / "served"
+    served_dir.mkdir(parents=True, exist_ok=True)
+
+    specs = []
+    for case in cases:
+        print(f"📦 Preparing {case.name} ({format_bytes(case.size)})")
+        path = build_payload(case, served_dir)
+        specs.append(dict(file_id=case.file_id, path=str(path), name=path.name.split("-", 2)[-1], **case.behaviour))
+
+    ctx = multiprocessing.get_context("spawn")
+    port = free_port()
+    ready = ctx.Event()
+    server = ctx.Process(target=drive_stub.run_server, args=(specs, port, ready), daemon=True)
+    server.start()
+    if not ready.wait(30):
+        server.terminate()
+        sys.exit("Drive stand-in did not start")
+
+    rows = []
+    try:
+        for case in cases:
+            print(f"⏱️ Running {case.name}")
+            results = ctx.Queue()
+            child = ctx.Process(target=run_case, args=(case, port, work_dir, results))
+            child.start()
+            rows.append(results.get())
+            child.join()
+    finally:
+        server.terminate()
+        server.join()
+
+    print()
+    print_table(rows)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2)
+    sys.exit(0 if all(row.get("success") for row in rows) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,5 @@
+"""Stand-in for ComfyUI's folder_paths module when benchmarking outside ComfyUI"""
+import os
+import tempfile
+
+base_path = os.environ.get("GDRIVE_BENCH_COMFYUI_BASE") or os.path.join(tempfile.gettempdir(), "gdrive_bench_comfyui")
@@ -0,0 +1,16 @@
+"""Stand-in for ComfyUI's server module when benchmarking outside ComfyUI"""
+from aiohttp import web
+
+class PromptServer:
+    instance = None
+
+    def __init__(self):
+        self.routes = web.RouteTableDef()
+        self.prompt_queue = None
+        self.events_sent = 0
+
+    def send_sync(self, event, data, sid=None):
+        self.events_sent += 1
+
+
+PromptServer.instance = PromptServer()
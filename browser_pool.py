@@ -0,0 +1,185 @@
+import os
+import time
+import asyncio
+import tempfile
+from contextlib import asynccontextmanager
+from playwright.async_api import async_playwright
+
+DEFAULT_USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+
+class BrowserManager:
+    """Long-lived headless Chromium shared by all downloads.
+
+    The browser is launched on first use, hands out isolated contexts from a
+    bounded pool, is relaunched if it crashes and is shut down again once no
+    context has been in use for ``idle_timeout`` seconds. Browser downloads
+    land in ``downloads_path`` so their progress can be watched, and
+    ``on_launch(seconds)`` is told how long each launch took.
+    """
+
+    def __init__(self, max_contexts=4, idle_timeout=300, launch_args=None, downloads_path=None, on_launch=None):
+        self.max_contexts = max_contexts
+        self.idle_timeout = idle_timeout
+        self.launch_args = launch_args or ['--no-sandbox', '--disable-setuid-sandbox']
+        self.downloads_path = downloads_path
+        self.on_launch = on_launch
+        self._playwright = None
+        self._browser = None
+        self._lock = None
+        self._slots = None
+        self._active = 0
+        self._idle_handle = None
+        self._claimed = set()
+
+    def _ensure_primitives(self):
+        # Created lazily so they bind to ComfyUI's running loop, not the import-time one
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+            self._slots = asyncio.Semaphore(self.max_contexts)
+
+    def _on_disconnected(self, browser):
+        if self._browser is browser:
+            print("⚠️ Chromium disconnected, it will be relaunched on next download")
+            self._browser = None
+
+    async def _ensure_browser(self):
+        async with self._lock:
+            if self._browser is not None and self._browser.is_connected():
+                return self._browser
+
+            if self._playwright is None:
+                self._playwright = await async_playwright().start()
+
+            if self.downloads_path is None:
+                self.downloads_path = tempfile.mkdtemp(prefix="gdrive_browser_downloads_")
+
+            print("🚀 Launching headless Chromium...")
+            launch_started = time.monotonic()
+            browser = await self._playwright.chromium.launch(
+                headless=True,
+                args=self.launch_args,
+                downloads_path=self.downloads_path
+            )
+            browser.on("disconnected", self._on_disconnected)
+            self._browser = browser
+            if self.on_launch:
+                self.on_launch(time.monotonic() - launch_started)
+            return browser
+
+    async def _new_context(self, **context_options):
+        browser = await self._ensure_browser()
+        try:
+            return await browser.new_context(**context_options)
+        except Exception as e:
+            # The browser may have crashed between the connectivity check and now
+            print(f"⚠️ Failed to open browser context ({e}), relaunching Chromium")
+            async with self._lock:
+                if self._browser is browser:
+                    self._browser = None
+            browser = await self._ensure_browser()
+            return await browser.new_context(**context_options)
+
+    def _cancel_idle_shutdown(self):
+        if self._idle_handle is not None:
+            self._idle_handle.cancel()
+            self._idle_handle = None
+
+    def _schedule_idle_shutdown(self):
+        self._cancel_idle_shutdown()
+        if self.idle_timeout is None:
+            return
+        loop = asyncio.get_event_loop()
+        self._idle_handle = loop.call_later(
+            self.idle_timeout,
+            lambda: asyncio.ensure_future(self._shutdown_if_idle())
+        )
+
+    async def _shutdown_if_idle(self):
+        self._idle_handle = None
+        async with self._lock:
+            # Re-checked under the lock so a download starting right now keeps its browser
+            if self._active == 0 and self._browser is not None:
+                print("💤 Browser idle, shutting down Chromium")
+                await self._close_locked()
+
+    def download_files(self):
+        """Names of the files in the downloads folder, one per browser download"""
+        if not self.downloads_path:
+            return set()
+        try:
+            return set(os.listdir(self.downloads_path))
+        except OSError:
+            return set()
+
+    def claim_download_file(self, before):
+        """Attribute a file that appeared since the ``before`` snapshot to the caller's download.
+
+        Playwright does not say which file belongs to which download, so the
+        earliest new file no other download has claimed is taken. Returns
+        None until one appears; pair with ``release_download_file``.
+        """
+        candidates = []
+        for name in self.download_files() - set(before) - self._claimed:
+            try:
+                candidates.append((os.stat(os.path.join(self.downloads_path, name)).st_ctime_ns, name))
+            except OSError:
+                pass
+        if not candidates:
+            return None
+        name = min(candidates)[1]
+        self._claimed.add(name)
+        return name
+
+    def release_download_file(self, name):
+        self._claimed.discard(name)
+
+    def download_file_bytes(self, name):
+        """Bytes written so far to one file in the downloads folder"""
+        try:
+            return os.path.getsize(os.path.join(self.downloads_path, name))
+        except (OSError, TypeError):
+            return 0
+
+    @asynccontextmanager
+    async def context(self, **context_options):
+        """Borrow an isolated BrowserContext from the pool"""
+        self._ensure_primitives()
+        context_options.setdefault('user_agent', DEFAULT_USER_AGENT)
+
+        async with self._slots:
+            self._active += 1
+            self._cancel_idle_shutdown()
+            context = None
+            try:
+                context = await self._new_context(**context_options)
+                yield context
+            finally:
+                if context is not None:
+                    try:
+                        await context.close()
+                    except Exception as e:
+                        print(f"⚠️ Error closing browser context: {e}")
+                self._active -= 1
+                if self._active == 0:
+                    self._schedule_idle_shutdown()
+
+    async def shutdown(self):
+        """Close the browser and stop Playwright"""
+        self._ensure_primitives()
+        self._cancel_idle_shutdown()
+        async with self._lock:
+            await self._close_locked()
+
+    async def _close_locked(self):
+        browser, self._browser = self._browser, None
+        playwright, self._playwright = self._playwright, None
+        if browser is not None:
+            try:
+                await browser.close()
+            except Exception as e:
+                print(f"⚠️ Error closing browser: {e}")
+        if playwright is not None:
+            try:
+                await playwright.stop()
+            except Exception as e:
+                print(f"⚠️ Error stopping Playwright: {e}")
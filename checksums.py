@@ -0,0 +1,109 @@
+import os
+import asyncio
+import hashlib
+from pathlib import Path
+from .json_index import JsonIndex
+
+HASH_CHUNK_SIZE = 4 * 1024 * 1024
+
+try:
+    import blake3
+except ImportError:
+    blake3 = None
+
+class ChecksumMismatch(Exception):
+    """Raised when a downloaded file does not match its expected hash"""
+
+
+def new_hash(algorithm):
+    if algorithm == 'sha256':
+        return hashlib.sha256()
+    if algorithm == 'blake3':
+        if blake3 is None:
+            raise ValueError("BLAKE3 hashing needs the blake3 package installed")
+        return blake3.blake3()
+    raise ValueError(f"Unsupported hash algorithm: {algorithm}")
+
+
+class StreamHasher:
+    """Hashes a file incrementally, in order, as its bytes are written.
+
+    ``bytes_hashed`` tells how long the hashed prefix is, so a download that
+    could only be hashed partly inline (parallel or resumed ranges) can be
+    finished by reading just the remainder back with ``hash_file``.
+    """
+
+    def __init__(self, algorithms=('sha256',)):
+        self.hashes = {algorithm: new_hash(algorithm) for algorithm in algorithms}
+        self.bytes_hashed = 0
+
+    def reset(self):
+        """Start over, e.g. when a download is retried from scratch by another engine"""
+        self.hashes = {algorithm: new_hash(algorithm) for algorithm in self.hashes}
+        self.bytes_hashed = 0
+
+    def update(self, chunk):
+        for h in self.hashes.values():
+            h.update(chunk)
+        self.bytes_hashed += len(chunk)
+
+    async def update_async(self, chunk):
+        """Hash a chunk in a worker thread (hashlib releases the GIL) so it overlaps the disk write"""
+        loop = asyncio.get_event_loop()
+        await loop.run_in_executor(None, self.update, chunk)
+
+    def hexdigests(self):
+        return {algorithm: h.hexdigest() for algorithm, h in self.hashes.items()}
+
+
+def hash_file(file_path, hasher, stage=None):
+    """Feed the part of ``file_path`` the hasher has not seen yet, returning its digests"""
+    size = os.path.getsize(file_path)
+    with open(file_path, 'rb') as f:
+        f.seek(hasher.bytes_hashed)
+        while True:
+            if stage:
+                stage.check()
+            chunk = f.read(HASH_CHUNK_SIZE)
+            if not chunk:
+                break
+            hasher.update(chunk)
+            if stage and size:
+                stage.report(hasher.bytes_hashed / size)
+    return hasher.hexdigests()
+
+
+class HashIndex:
+    """Persistent map of file path -> size, mtime and hashes.
+
+    An entry is only trusted while the file's size and mtime still match what
+    was recorded, so the existence check can rely on it instead of re-hashing
+    multi-GB files, and spots files truncated or replaced since. The index
+    is shared by ComfyUI processes using the same ``models`` directory:
+    it is re-read when another process rewrites it, and updated under a
+    lock file starting from a fresh read.
+    """
+
+    def __init__(self, index_path):
+        self.index = JsonIndex(index_path)
+
+    @staticmethod
+    def _key(file_path):
+        return str(Path(file_path).resolve())
+
+    def lookup(self, file_path):
+        """Return ``(entry, fresh)``; ``fresh`` is False if the file changed since it was recorded"""
+        entry = self.index.get(self._key(file_path))
+        if entry is None:
+            return None, False
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return entry, False
+        return entry, stat.st_size == entry['size'] and stat.st_mtime_ns == entry['mtime_ns']
+
+    def record(self, file_path, digests):
+        stat = os.stat(file_path)
+        with self.index.locked() as entries:
+            entries[self._key(file_path)] = dict(digests, size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+            self.index.save()
@@ -0,0 +1,129 @@
+import os
+import time
+import shutil
+from pathlib import Path
+from .json_index import JsonIndex
+
+DEFAULT_CACHE_MAX_BYTES = 50 * 1024 ** 3  # 50 GiB
+FICLONE = 0x40049409  # Linux ioctl for copy-on-write clones (btrfs, xfs)
+
+def link_or_copy(source, dest):
+    """Materialize ``source`` at ``dest`` as cheaply as the filesystem allows.
+
+    Tries a hardlink, then a reflink clone, then a plain copy, and returns
+    which method was used.
+    """
+    source, dest = Path(source), Path(dest)
+    if dest.exists():
+        dest.unlink()
+
+    try:
+        os.link(source, dest)
+        return "hardlink"
+    except OSError:
+        pass
+
+    try:
+        import fcntl
+        with open(source, 'rb') as src, open(dest, 'wb') as dst:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+        return "reflink"
+    except (ImportError, OSError):
+        if dest.exists():
+            dest.unlink()
+
+    shutil.copyfile(source, dest)
+    return "copy"
+
+
+class DownloadCache:
+    """Local cache of downloaded Google Drive files, keyed by file ID and size.
+
+    Files are stored as ``<file_id>-<size>`` blobs with a JSON index that
+    records their last use. A repeat download of the same file, under any
+    name or destination, is served from the cache by hardlink, reflink or
+    copy. The least recently used blobs are evicted once the cache grows
+    past ``max_bytes``. Index updates hold a lock file and start from a
+    fresh read, so ComfyUI processes sharing the cache keep each other's
+    entries.
+    """
+
+    def __init__(self, cache_dir, max_bytes=DEFAULT_CACHE_MAX_BYTES):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.index = JsonIndex(self.cache_dir / "index.json", self.cache_dir / "index.lock")
+
+    def _blob_path(self, entry):
+        return self.cache_dir / entry["blob"]
+
+    def _drop(self, entries, key):
+        entry = entries.pop(key, None)
+        if entry:
+            try:
+                self._blob_path(entry).unlink()
+            except FileNotFoundError:
+                pass
+
+    def lookup(self, file_id, size=None):
+        """Return the most recently cached entry for ``file_id`` (of ``size`` bytes if given), or None"""
+        with self.index.locked() as entries:
+            candidates = [
+                (key, entry) for key, entry in entries.items()
+                if entry["file_id"] == file_id and (size is None or entry["size"] == size)
+            ]
+            for key, entry in sorted(candidates, key=lambda item: item[1]["last_used"], reverse=True):
+                try:
+                    if self._blob_path(entry).stat().st_size == entry["size"]:
+                        return dict(entry)
+                except OSError:
+                    pass
+                # Blob missing or truncated, forget it
+                self._drop(entries, key)
+                self.index.save()
+            return None
+
+    def materialize(self, entry, dest):
+        """Place a cached blob at ``dest``, returning the method used"""
+        method = link_or_copy(self._blob_path(entry), dest)
+        with self.index.locked() as entries:
+            key = entry["blob"]
+            if key in entries:
+                entries[key]["last_used"] = time.time()
+                self.index.save()
+        print(f"♻️ Served {entry['file_id']} from cache via {method}")
+        return method
+
+    def store(self, file_id, source_path, sha256=None):
+        """Add a downloaded file to the cache and evict old entries past the size cap"""
+        source_path = Path(source_path)
+        size = source_path.stat().st_size
+        if size > self.max_bytes:
+            return None
+
+        blob = f"{file_id}-{size}"
+        # Linking or copying can take a while, keep it outside the index lock;
+        # the per-file-ID download lock already keeps writers of this blob apart
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        link_or_copy(source_path, self.cache_dir / blob)
+        with self.index.locked() as entries:
+            entries[blob] = {
+                "file_id": file_id,
+                "blob": blob,
+                "size": size,
+                "sha256": sha256,
+                "last_used": time.time()
+            }
+
+            total = sum(entry["size"] for entry in entries.values())
+            for key, entry in sorted(entries.items(), key=lambda item: item[1]["last_used"]):
+                if total <= self.max_bytes:
+                    break
+                if key == blob:
+                    continue
+                total -= entry["size"]
+                print(f"🧹 Evicting {key} from download cache")
+                self._drop(entries, key)
+
+            self.index.save()
+            return dict(entries[blob])
+
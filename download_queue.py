@@ -0,0 +1,180 @@
+import asyncio
+import itertools
+import time
+import uuid
+from collections import OrderedDict, defaultdict
+
+class DownloadJob:
+    """A queued download request and its outcome"""
+
+    def __init__(self, job_id, params, priority=0, destination=None, seq=0, runner=None):
+        self.job_id = job_id
+        self.params = params
+        self.runner = runner
+        self.priority = priority
+        self.destination = destination
+        self.seq = seq
+        self.status = "queued"
+        self.result = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.task = None
+        self.done = asyncio.Event()
+
+    @property
+    def finished(self):
+        return self.status in ("completed", "failed", "cancelled")
+
+    def to_dict(self, position=None):
+        data = {
+            "job_id": self.job_id,
+            "status": self.status,
+            "priority": self.priority,
+            "destination": self.destination,
+            "filename": self.params.get("filename"),
+            "google_drive_url": self.params.get("google_drive_url"),
+            "session_id": self.params.get("session_id"),
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+        if position is not None:
+            data["position"] = position
+        if self.params.get("throttle") is not None:
+            data["limits"] = self.params["throttle"].to_dict()
+        if self.result is not None:
+            data["result"] = self.result
+        return data
+
+
+class DownloadQueue:
+    """In-process download scheduler.
+
+    Jobs are started highest priority first (FIFO within a priority) as long
+    as fewer than ``max_concurrent`` jobs are running overall and fewer than
+    ``max_per_destination`` are writing into the same directory. A job whose
+    destination is saturated does not block jobs behind it for other folders.
+    """
+
+    def __init__(self, runner, max_concurrent=3, max_per_destination=2, keep_finished=100):
+        self.runner = runner
+        self.max_concurrent = max_concurrent
+        self.max_per_destination = max_per_destination
+        self.keep_finished = keep_finished
+        self.jobs = OrderedDict()
+        self._pending = []
+        self._running = 0
+        self._running_by_destination = defaultdict(int)
+        self._seq = itertools.count()
+
+    def submit(self, params, priority=0, destination=None, runner=None):
+        """Queue a download, returning its job immediately; ``runner`` overrides the queue's default"""
+        job = DownloadJob(uuid.uuid4().hex, params, priority, destination, next(self._seq), runner)
+        self.jobs[job.job_id] = job
+        self._pending.append(job)
+        self._dispatch()
+        self._prune()
+        return job
+
+    def get(self, job_id):
+        return self.jobs.get(job_id)
+
+    def queued(self):
+        """Pending jobs in the order they will be considered"""
+        return sorted(self._pending, key=lambda job: (-job.priority, job.seq))
+
+    def position(self, job):
+        try:
+            return self.queued().index(job) + 1
+        except ValueError:
+            return None
+
+    def list(self):
+        positions = {job.job_id: index + 1 for index, job in enumerate(self.queued())}
+        return [job.to_dict(positions.get(job.job_id)) for job in self.jobs.values()]
+
+    @property
+    def depth(self):
+        return len(self._pending)
+
+    @property
+    def running(self):
+        return self._running
+
+    def set_priority(self, job_id, priority):
+        """Reorder a queued job; returns False if it is unknown or already started"""
+        job = self.jobs.get(job_id)
+        if job is None or job.status != "queued":
+            return False
+        job.priority = priority
+        self._dispatch()
+        return True
+
+    def cancel(self, job_id):
+        """Cancel a queued or running job; returns False if it is unknown or finished"""
+        job = self.jobs.get(job_id)
+        if job is None or job.finished:
+            return False
+        if job.status == "queued":
+            self._pending.remove(job)
+            self._finish(job, "cancelled", {"success": False, "error": "Cancelled"})
+        elif job.task is not None:
+            job.task.cancel()
+        return True
+
+    async def wait(self, job):
+        """Wait for a job to finish and return its result payload"""
+        await job.done.wait()
+        return job.result
+
+    def _can_start(self, job):
+        if self._running >= self.max_concurrent:
+            return False
+        if job.destination is None:
+            return True
+        return self._running_by_destination[job.destination] < self.max_per_destination
+
+    def _dispatch(self):
+        for job in self.queued():
+            if self._running >= self.max_concurrent:
+                break
+            if self._can_start(job):
+                self._start(job)
+
+    def _start(self, job):
+        self._pending.remove(job)
+        self._running += 1
+        if job.destination is not None:
+            self._running_by_destination[job.destination] += 1
+        job.status = "running"
+        job.started_at = time.time()
+        job.task = asyncio.ensure_future(self._run(job))
+
+    async def _run(self, job):
+        try:
+            result = await (job.runner or self.runner)(**job.params)
+            status = "completed" if result.get("success") else "failed"
+        except asyncio.CancelledError:
+            status, result = "cancelled", {"success": False, "error": "Cancelled"}
+        except Exception as e:
+            status, result = "failed", {"success": False, "error": str(e)}
+        finally:
+            self._running -= 1
+            if job.destination is not None:
+                self._running_by_destination[job.destination] -= 1
+                if not self._running_by_destination[job.destination]:
+                    del self._running_by_destination[job.destination]
+        self._finish(job, status, result)
+        self._dispatch()
+
+    def _finish(self, job, status, result):
+        job.status = status
+        job.result = dict(result, job_id=job.job_id)
+        job.finished_at = time.time()
+        job.done.set()
+
+    def _prune(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(finished) - self.keep_finished)]:
+            del self.jobs[job_id]
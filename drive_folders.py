@@ -0,0 +1,72 @@
+import re
+import html
+from pathlib import PurePosixPath
+
+FOLDER_LIST_URL = "https://drive.google.com/embeddedfolderview?id={folder_id}"
+MAX_FOLDER_DEPTH = 10
+
+FOLDER_URL_PATTERNS = [
+    r'/drive/(?:u/\d+/)?folders/([a-zA-Z0-9_-]+)',
+    r'/folderview\?(?:.*&)?id=([a-zA-Z0-9_-]+)',
+    r'/embeddedfolderview\?(?:.*&)?id=([a-zA-Z0-9_-]+)',
+]
+
+ENTRY_PATTERN = re.compile(
+    r'<div class="flip-entry" id="entry-([a-zA-Z0-9_-]+)".*?'
+    r'<a href="([^"]+)".*?'
+    r'<div class="flip-entry-title">(.*?)</div>',
+    re.S
+)
+
+class DriveFolderError(Exception):
+    """Raised when a Google Drive folder cannot be listed"""
+
+
+def extract_folder_id(url):
+    """Return the folder ID of a Google Drive folder URL, or None for other URLs"""
+    for pattern in FOLDER_URL_PATTERNS:
+        match = re.search(pattern, url)
+        if match:
+            return match.group(1)
+    return None
+
+
+def safe_name(name):
+    """Make a Drive item title usable as a single path component"""
+    name = re.sub(r'[\\/:*?"<>|\x00-\x1f]', '_', html.unescape(name)).strip()
+    return name if name not in ('', '.', '..') else '_'
+
+
+async def list_folder(session, folder_id):
+    """List the direct children of a public folder as (item_id, name, is_folder) tuples"""
+    async with session.get(FOLDER_LIST_URL.format(folder_id=folder_id)) as response:
+        if response.status != 200:
+            raise DriveFolderError(f"Listing folder {folder_id} returned HTTP {response.status}")
+        page_html = await response.text()
+
+    if 'flip-entries' not in page_html:
+        raise DriveFolderError(f"Folder {folder_id} is not publicly shared or does not exist")
+
+    return [
+        (item_id, safe_name(title), '/folders/' in href)
+        for item_id, href, title in ENTRY_PATTERN.findall(page_html)
+    ]
+
+
+async def walk_folder(session, folder_id, relative=PurePosixPath(), depth=0, seen=None):
+    """Recursively list a folder tree as (file_id, relative_path) tuples"""
+    seen = seen if seen is not None else set()
+    if folder_id in seen:
+        return []
+    if depth > MAX_FOLDER_DEPTH:
+        print(f"⚠️ Skipping {relative}: folder nesting deeper than {MAX_FOLDER_DEPTH}")
+        return []
+    seen.add(folder_id)
+
+    files = []
+    for item_id, name, is_folder in await list_folder(session, folder_id):
+        if is_folder:
+            files.extend(await walk_folder(session, item_id, relative / name, depth + 1, seen))
+        else:
+            files.append((item_id, relative / name))
+    return files
@@ -0,0 +1,88 @@
+import os
+import time
+import asyncio
+import hashlib
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+class FileLock:
+    """Advisory inter-process lock on a lock file (flock on POSIX, msvcrt on Windows).
+
+    Acquisition polls without blocking so waiting never ties up a thread and
+    stays cancellable. Lock files are left in place after release; removing
+    them would race with processes about to lock them.
+    """
+
+    def __init__(self, lock_path, poll_interval=0.5):
+        self.lock_path = Path(lock_path)
+        self.poll_interval = poll_interval
+        self._fd = None
+
+    @classmethod
+    def for_key(cls, lock_dir, key):
+        """Lock named after an arbitrary key such as a file ID or destination path"""
+        digest = hashlib.sha1(str(key).encode('utf-8')).hexdigest()[:20]
+        return cls(Path(lock_dir) / f"{digest}.lock")
+
+    def try_acquire(self):
+        if self._fd is not None:
+            return True
+        self.lock_path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+        except OSError:
+            os.close(fd)
+            return False
+        self._fd = fd
+        return True
+
+    async def acquire(self, on_wait=None):
+        """Wait for the lock; ``on_wait()`` is called once if another holder makes us wait"""
+        waited = False
+        while not self.try_acquire():
+            if not waited and on_wait:
+                on_wait()
+            waited = True
+            await asyncio.sleep(self.poll_interval)
+        return waited
+
+    def acquire_blocking(self):
+        """Wait for the lock in the calling thread, for short critical sections run off the event loop"""
+        while not self.try_acquire():
+            time.sleep(self.poll_interval)
+
+    def release(self):
+        if self._fd is None:
+            return
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+            else:
+                os.lseek(self._fd, 0, os.SEEK_SET)
+                msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)
+        finally:
+            os.close(self._fd)
+            self._fd = None
+
+    def __enter__(self):
+        self.acquire_blocking()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.release()
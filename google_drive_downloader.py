@@ -1,23 +1,87 @@
 import os
 import re
 import asyncio
-import aiofiles
+import aiohttp
 import zipfile
-import tempfile
 import json
-import shutil
+import functools
+import time
+import uuid
 from pathlib import Path
-from playwright.async_api import async_playwright
 import folder_paths
 import server
-import torch
+from .browser_pool import BrowserManager
+from .http_engine import HttpDownloader, DriveHTTPError, DownloadInterrupted, DownloadStalled, is_transient
+from .resume import PartialManifest
+from .download_queue import DownloadQueue
+from .model_validation import validate_model_file, is_model_file, ValidationError
+from .postprocess import PostProcessPipeline, StageCancelled
+from .download_cache import DownloadCache, DEFAULT_CACHE_MAX_BYTES, link_or_copy
+from .progress import ProgressReporter
+from .drive_folders import extract_folder_id, walk_folder, safe_name, DriveFolderError
+from .batch import parse_manifest, order_by_size, check_free_space, ManifestError
+from .checksums import StreamHasher, HashIndex, ChecksumMismatch, hash_file
+from .file_lock import FileLock
+from .single_flight import SharedFetch
+from .staging import staging_path, atomic_replace, ensure_free_space, preallocate
+from .retry import DEFAULT_RETRY_POLICIES
+from .metrics import DownloaderMetrics, StageTimer
+from .rate_limit import RateLimiter, parse_rate
+from playwright.async_api import Error as PlaywrightError
 
 # Global progress tracking
 progress_store = {}
 
+ZIP_STREAM_CHUNK_SIZE = 1024 * 1024
+FOLDER_DOWNLOAD_WORKERS = 4
+BATCH_DOWNLOAD_WORKERS = 3
+BROWSER_DOWNLOAD_START_TIMEOUT = 30  # Seconds for Drive's pages to hand the browser a download
+BROWSER_STALL_CHECK_INTERVAL = 1
+RATE_FIELDS = {"network_rate": "max_network_rate", "disk_rate": "max_disk_rate"}  # configure() argument: API field
+
+DOWNLOAD_BUTTON_SELECTORS = [
+    'a:has-text("Download anyway")',
+    '#uc-download-link',
+    'form#download-form [type="submit"]',
+    '[aria-label="Download"]',
+    'a[href*="export=download"]',
+]
+
 class GoogleDriveDownloaderAPI:
-    def __init__(self):
+    def __init__(self, cache_dir=None, cache_max_bytes=DEFAULT_CACHE_MAX_BYTES, hash_algorithms=('sha256',), retry_policies=None):
         self.comfyui_base = folder_paths.base_path
+        self.metrics = DownloaderMetrics()
+        self.browser_manager = BrowserManager(on_launch=lambda seconds: self.metrics.browser_launch.observe(seconds))
+        self.http_downloader = HttpDownloader()
+        self.pipeline = PostProcessPipeline()
+        self.progress = ProgressReporter(
+            progress_store,
+            send=lambda event, data: server.PromptServer.instance.send_sync(event, data)
+        )
+        
+        # Cache next to the model folders so it can hardlink into them; cache_max_bytes=0 disables it
+        cache_dir = cache_dir or Path(self.comfyui_base) / "models" / ".gdrive_cache"
+        self.cache = DownloadCache(cache_dir, cache_max_bytes) if cache_max_bytes else None
+        
+        # Hashes are computed while downloading; add 'blake3' to also record BLAKE3 digests
+        self.hash_algorithms = tuple(hash_algorithms)
+        self.hash_index = HashIndex(Path(self.comfyui_base) / "models" / ".gdrive_hash_index.json")
+        
+        # Identical downloads share one transfer in this process, and lock files
+        # next to the models keep other ComfyUI processes from repeating it
+        self.inflight = {}
+        self.lock_dir = Path(self.comfyui_base) / "models" / ".gdrive_locks"
+        
+        # Per-stage RetryPolicy overrides, e.g. {"http": RetryPolicy(attempts=6)}
+        self.retry_policies = dict(DEFAULT_RETRY_POLICIES, **(retry_policies or {}))
+        
+        # Global bandwidth limits (unlimited by default), adjustable at runtime via /google_drive_limits
+        self.limiter = RateLimiter(is_busy=self.prompt_executing)
+        
+    def prompt_executing(self):
+        """Whether ComfyUI is currently executing a prompt"""
+        prompt_queue = getattr(server.PromptServer.instance, 'prompt_queue', None)
+        return bool(getattr(prompt_queue, 'currently_running', None))
         
     def extract_file_id(self, url):
         """Extract file ID from various Google Drive URL formats"""
@@ -35,8 +99,12 @@ class GoogleDriveDownloaderAPI:
         
         raise ValueError(f"Could not extract file ID from URL: {url}")
 
-    def get_download_path(self, model_type, custom_path, filename):
-        """Determine the download path based on model type"""
+    def is_folder_url(self, url):
+        """Check if the URL points to a Google Drive folder rather than a file"""
+        return extract_folder_id(url) is not None
+
+    def get_destination_dir(self, model_type, custom_path):
+        """Determine the destination directory based on model type"""
         if model_type == "custom" and custom_path:
             base_path = Path(custom_path)
         else:
@@ -56,7 +124,11 @@ class GoogleDriveDownloaderAPI:
         # Ensure directory exists
         base_path.mkdir(parents=True, exist_ok=True)
         
-        return base_path / filename
+        return base_path
+
+    def get_download_path(self, model_type, custom_path, filename):
+        """Determine the download path based on model type"""
+        return self.get_destination_dir(model_type, custom_path) / filename
 
     def is_zip_file(self, file_path):
         """Check if the downloaded file is a zip archive"""
@@ -67,115 +139,199 @@ class GoogleDriveDownloaderAPI:
             return False
 
     def is_pth_file(self, filename):
-        """Check if the filename has a .pth extension"""
-        return filename.lower().endswith('.pth')
+        """Check if the filename has a model file extension (.pth, .ckpt, .safetensors, ...)"""
+        return is_model_file(filename)
 
     def validate_pth_file(self, file_path):
-        """Validate that a .pth file is a valid PyTorch model file"""
+        """Validate a model file from its metadata, without loading its tensors"""
         try:
-            # Try to load the file as a PyTorch state dict or model
-            checkpoint = torch.load(file_path, map_location='cpu')
-            
-            # Check if it's a valid PyTorch format (state_dict, model, or checkpoint)
-            if isinstance(checkpoint, dict):
-                print(f"✅ Valid PyTorch checkpoint file with keys: {list(checkpoint.keys())[:5]}...")
-                return True
-            elif hasattr(checkpoint, 'state_dict'):
-                print(f"✅ Valid PyTorch model file")
-                return True
-            else:
-                print(f"⚠️ File loaded but format is unclear: {type(checkpoint)}")
-                return True  # Still accept it as it loaded successfully
-                
-        except Exception as e:
-            print(f"❌ Invalid PyTorch file: {e}")
+            description = validate_model_file(file_path)
+            print(f"✅ Valid {description}")
+            return True
+        except (ValidationError, OSError) as e:
+            print(f"❌ Invalid model file: {e}")
             return False
 
-    def extract_zip_file(self, zip_path, extract_to, target_filename):
-        """Extract zip file and handle the extracted content"""
+    def extract_zip_file(self, zip_path, extract_to, target_filename, stage=None, hasher=None, throttle=None, verify=None):
+        """Stream a single-file zip straight to the target, or move a multi-file archive into place as-is"""
         try:
             with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-                file_list = zip_ref.namelist()
-                print(f"📦 Zip contains {len(file_list)} file(s): {file_list}")
-                
-                # Extract to folder named after target filename (without extension)
-                target_path = Path(extract_to)
-                folder_name = target_path.stem  # filename without extension
-                extract_dir = target_path.parent / folder_name
-                
-                # Clean up existing directory if it exists
-                if extract_dir.exists():
-                    shutil.rmtree(extract_dir)
-                
-                extract_dir.mkdir(exist_ok=True)
+                members = [info for info in zip_ref.infolist() if not info.is_dir()]
+                print(f"📦 Zip contains {len(members)} file(s): {[info.filename for info in members[:5]]}")
                 
-                # Extract all contents to the folder
-                zip_ref.extractall(extract_dir)
-                print(f"✅ Extracted {len(file_list)} files to: {extract_dir}")
+                if not members:
+                    raise FileNotFoundError(f"No files found in zip: {zip_path}")
                 
-                # Pack everything back into the target file
-                self.pack_folder_to_file(extract_dir, extract_to, target_filename)
-                
-                # Clean up extraction directory
-                shutil.rmtree(extract_dir)
-                
-                # Special validation for .pth files
-                if self.is_pth_file(target_filename):
-                    if self.validate_pth_file(extract_to):
-                        print(f"✅ PyTorch file validated successfully")
-                        return str(extract_to), True
-                    else:
-                        print(f"⚠️ PyTorch file validation failed but keeping file")
-                        return str(extract_to), True
-                
-                return str(extract_to), True
+                if len(members) == 1:
+                    # Single file - stream it out of the archive directly
+                    member = members[0]
+                    extracted = 0
+                    # Extract next to the target and swap it in, never writing through the
+                    # existing file (it may be hardlinked into the download cache)
+                    staged = staging_path(Path(extract_to).parent, f"{Path(extract_to).name}.extracting")
+                    ensure_free_space(staged.parent, member.file_size)
+                    try:
+                        with zip_ref.open(member) as src, open(staged, 'wb') as dst:
+                            preallocate(dst.fileno(), member.file_size)
+                            while True:
+                                if stage:
+                                    stage.check()
+                                chunk = src.read(ZIP_STREAM_CHUNK_SIZE)
+                                if not chunk:
+                                    break
+                                if throttle:
+                                    throttle.disk_sync(len(chunk), stage.check if stage else None)
+                                dst.write(chunk)
+                                if hasher:
+                                    hasher.update(chunk)
+                                extracted += len(chunk)
+                                if stage and member.file_size:
+                                    stage.report(extracted / member.file_size)
+                        if verify:
+                            verify(hasher.hexdigests() if hasher else None)
+                        atomic_replace(staged, extract_to)
+                    except BaseException:
+                        if staged.exists():
+                            staged.unlink()
+                        raise
+                    print(f"✅ Extracted single file: {member.filename} -> {extract_to}")
+            
+            if len(members) > 1:
+                # Multiple files - keep the original archive under the target filename
+                if verify:
+                    verify(None)
+                atomic_replace(zip_path, extract_to)
+                print(f"✅ Kept {len(members)}-file archive as: {extract_to}")
+            
+            return str(extract_to), True
                     
+        except (StageCancelled, ChecksumMismatch):
+            raise
         except Exception as e:
             print(f"❌ Error extracting zip file: {e}")
             return str(zip_path), False
 
-    def pack_folder_to_file(self, folder_path, output_path, target_filename):
-        """Pack all contents of a folder back into a single file"""
-        folder = Path(folder_path)
-        
-        if not folder.exists() or not folder.is_dir():
-            raise FileNotFoundError(f"Folder not found: {folder}")
+    def finalize_file(self, temp_download_path, final_download_path, overwrite=False):
+        """Flush a finished download to disk and atomically replace the destination with it"""
+        atomic_replace(temp_download_path, final_download_path)
+        return str(final_download_path)
+
+    def remove_file(self, file_path):
+        """Remove a file if it still exists"""
+        if file_path.exists():
+            file_path.unlink()
+
+    async def post_process(self, temp_download_path, final_download_path, filename, overwrite=False, auto_extract_zip=True, progress_callback=None, digests=None, timings=None, throttle=None, expected_sha256=None):
+        """Zip handling, finalize and validation, each run as a pipeline stage off the event loop"""
+        run_stage = functools.partial(self.pipeline.run_stage, progress_callback=progress_callback, timings=timings)
         
-        # Get all files in the folder (recursively), excluding directories
-        all_files = list(folder.rglob('*'))
-        files_only = [f for f in all_files if f.is_file()]
+        def verify(extracted_digests=None):
+            final = extracted_digests or digests
+            if expected_sha256 and final and final['sha256'] != expected_sha256:
+                raise ChecksumMismatch(f"SHA-256 mismatch: expected {expected_sha256}, got {final['sha256']}")
         
-        if not files_only:
-            raise FileNotFoundError(f"No files found in folder: {folder}")
+        final_digests = digests
+        file_size = temp_download_path.stat().st_size
+        is_model = self.is_pth_file(filename)
         
-        print(f"📁 Found {len(files_only)} files to pack: {[f.name for f in files_only[:5]]}")
+        # Check if the downloaded file is a zip and should be extracted
+        is_zip = auto_extract_zip and await run_stage("Checking for zip archive", self.is_zip_file, temp_download_path, start=72, light=True)
         
-        if len(files_only) == 1:
-            # Single file - just copy it directly
-            single_file = files_only[0]
-            if single_file.is_file():  # Double-check it's actually a file
-                shutil.copyfile(single_file, output_path)
-                print(f"✅ Packed single file: {single_file.name} -> {output_path}")
+        if is_zip:
+            extract_hasher = StreamHasher(self.hash_algorithms)
+            try:
+                final_path, extract_success = await run_stage(
+                    "Extracting zip file", self.extract_zip_file,
+                    temp_download_path, final_download_path, filename,
+                    start=75, end=88, with_context=True, hasher=extract_hasher, throttle=throttle, verify=verify
+                )
+            except (StageCancelled, ChecksumMismatch):
+                raise
+            except Exception as e:
+                final_path, extract_success = str(final_download_path), False
+                print(f"❌ Error extracting zip file: {e}")
+            
+            if extract_success:
+                # Clean up temporary zip file (already moved if it was kept as-is)
+                await run_stage("Cleaning up", self.remove_file, temp_download_path, start=89, light=True)
+                message = "Download and extraction completed successfully"
+                if extract_hasher.bytes_hashed:
+                    # A single member was streamed out, its bytes differ from the download's
+                    final_digests = extract_hasher.hexdigests()
             else:
-                raise FileNotFoundError(f"Expected file but found directory: {single_file}")
+                # Move zip file to final location as fallback
+                if temp_download_path.exists():
+                    verify()
+                    final_path = await run_stage("Keeping zip file", self.finalize_file, temp_download_path, final_download_path, overwrite, start=89)
+                if final_digests:
+                    await run_stage("Recording checksum", self.hash_index.record, final_path, final_digests, start=90, light=True)
+                return {"success": True, "file_path": final_path, "message": "Download completed (extraction failed, kept as zip)", **(final_digests or {})}
         else:
-            # Multiple files - create a zip archive with the target filename
-            with zipfile.ZipFile(output_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-                for file_path in files_only:
-                    if file_path.is_file():  # Ensure we only add files, not directories
-                        # Create relative path from folder root
-                        relative_path = file_path.relative_to(folder)
-                        zipf.write(file_path, relative_path)
-                        print(f"  📄 Added to zip: {relative_path}")
-            print(f"✅ Packed {len(files_only)} files into: {output_path}")
-        
-        return str(output_path)
-
-    async def download_file_async(self, google_drive_url, filename, model_type, custom_path="", overwrite=False, auto_extract_zip=True, progress_callback=None, session_id=None):
+            # Not a zip file or extraction disabled
+            verify()
+            final_path = await run_stage("Moving file into place", self.finalize_file, temp_download_path, final_download_path, overwrite, start=85)
+            message = f"Download completed successfully ({file_size} bytes)"
+        
+        # Validate model files whether or not they came out of a zip
+        if is_model:
+            if await run_stage("Validating model file", self.validate_pth_file, final_path, start=90, end=99, light=True):
+                message = f"Model file downloaded and validated successfully ({file_size} bytes)"
+            else:
+                message = f"Model file downloaded but validation failed ({file_size} bytes)"
+        
+        if final_digests:
+            await run_stage("Recording checksum", self.hash_index.record, final_path, final_digests, start=99, light=True)
+        
+        return {"success": True, "file_path": final_path, "message": message, **(final_digests or {})}
+
+    def is_present(self, file_path, expected_sha256=None):
+        """Cheap presence check for planning, trusting only what the hash index already knows"""
+        entry, fresh = self.hash_index.lookup(file_path)
+        if entry is not None and not fresh and entry['size'] != file_path.stat().st_size:
+            return False
+        if not expected_sha256:
+            return True
+        return fresh and entry.get('sha256') == expected_sha256
+
+    async def existing_file_ok(self, file_path, expected_sha256=None, progress_callback=None):
+        """Decide whether an existing destination file can be kept instead of downloading again"""
+        entry, fresh = self.hash_index.lookup(file_path)
+        if entry is not None and not fresh and entry['size'] != file_path.stat().st_size:
+            print(f"⚠️ {file_path} changed size since it was downloaded (truncated?), downloading again")
+            return False
+        if not expected_sha256:
+            return True
+        if entry is not None and fresh and entry.get('sha256'):
+            return entry['sha256'] == expected_sha256
+        
+        # Not indexed yet (or touched since): hash it once and remember the result
+        digests = await self.pipeline.run_stage(
+            "Verifying existing file", hash_file, file_path, StreamHasher(self.hash_algorithms),
+            start=12, end=14, progress_callback=progress_callback, with_context=True
+        )
+        await self.pipeline.run_stage("Recording checksum", self.hash_index.record, file_path, digests, light=True)
+        return digests['sha256'] == expected_sha256
+
+    async def download_file_async(self, google_drive_url, filename, model_type, custom_path="", overwrite=False, auto_extract_zip=True, progress_callback=None, session_id=None, on_bytes=None, expected_sha256=None, include_timings=False, throttle=None):
         """Async version of download_file with progress callbacks"""
+        expected_sha256 = expected_sha256.lower() if expected_sha256 else None
+        throttle = throttle or self.limiter.job()
+        destination_lock = None
+        timings = {}
+        job_started = time.monotonic()
+        
+        def finish(result, cause=None):
+            timings["total"] = time.monotonic() - job_started
+            self.metrics.record_job(timings, result)
+            if cause:
+                self.metrics.failures.inc(cause=cause)
+            if include_timings:
+                result["timings"] = {stage: round(seconds, 3) for stage, seconds in timings.items()}
+            return result
+        
         try:
             if session_id:
-                progress_store[session_id] = {"status": "starting", "message": "Extracting file ID...", "percentage": 0}
+                self.progress.publish(session_id, {"status": "starting", "message": "Extracting file ID...", "percentage": 0})
             
             if progress_callback:
                 progress_callback("Extracting file ID...")
@@ -184,224 +340,606 @@ class GoogleDriveDownloaderAPI:
             print(f"Extracted file ID: {file_id}")
             
             if session_id:
-                progress_store[session_id] = {"status": "progress", "message": f"File ID extracted: {file_id}", "percentage": 10}
+                self.progress.publish(session_id, {"status": "progress", "message": f"File ID extracted: {file_id}", "percentage": 10})
             
             final_download_path = self.get_download_path(model_type, custom_path, filename)
             
+            # Serialize with other requests and ComfyUI processes writing the same destination
+            destination_lock = FileLock.for_key(self.lock_dir, f"dest:{final_download_path.resolve()}")
+            with StageTimer(timings, "destination_lock"):
+                await destination_lock.acquire(
+                    on_wait=lambda: print(f"⏳ Waiting for another download of {final_download_path.name} to finish")
+                )
+            
+            if final_download_path.exists() and not overwrite and not await self.existing_file_ok(final_download_path, expected_sha256):
+                overwrite = True
+            
             if final_download_path.exists() and not overwrite:
                 if session_id:
-                    progress_store[session_id] = {"status": "completed", "message": "File already exists!", "percentage": 100}
+                    self.progress.publish(session_id, {"status": "completed", "message": "File already exists!", "percentage": 100})
                 if progress_callback:
                     progress_callback("File already exists!")
-                return {"success": True, "file_path": str(final_download_path), "message": "File already exists"}
+                return finish({"success": True, "file_path": str(final_download_path), "message": "File already exists"})
             
             # Create progress callback that updates both local callback and session store
-            def combined_progress_callback(message, percentage=None):
+            def combined_progress_callback(message, percentage=None, bytes_done=None, bytes_total=None):
                 if session_id:
                     update_data = {"status": "progress", "message": message}
                     if percentage is not None:
                         update_data["percentage"] = percentage
-                    progress_store[session_id] = update_data
+                    self.progress.publish(session_id, update_data, bytes_done, bytes_total)
+                if on_bytes and bytes_done is not None:
+                    on_bytes(bytes_done, bytes_total)
                 if progress_callback:
                     progress_callback(message)
             
-            # Download using Playwright
             combined_progress_callback("Starting download...", 15)
-            success, suggested_filename, temp_download_path = await self.download_with_playwright(
-                file_id, final_download_path, combined_progress_callback
-            )
+            with StageTimer(timings, "fetch"):
+                success, temp_download_path, digests = await self.fetch_shared(
+                    file_id, final_download_path, combined_progress_callback, expected_sha256, timings, throttle,
+                    use_cache=not overwrite
+                )
             
             if not success or not temp_download_path.exists():
                 if session_id:
-                    progress_store[session_id] = {"status": "error", "message": "Download failed!", "percentage": 0}
+                    self.progress.publish(session_id, {"status": "error", "message": "Download failed!", "percentage": 0})
                 if progress_callback:
                     progress_callback("Download failed!")
-                return {"success": False, "error": "Download failed"}
+                return finish({"success": False, "error": "Download failed"}, cause="download_failed")
             
             file_size = temp_download_path.stat().st_size
             combined_progress_callback(f"Downloaded {file_size} bytes", 70)
             
-            # Check if the downloaded file is a zip and should be extracted
-            if auto_extract_zip and self.is_zip_file(temp_download_path):
-                if self.is_pth_file(filename):
-                    combined_progress_callback("Extracting and validating PyTorch model...", 75)
-                else:
-                    combined_progress_callback("Extracting zip file...", 75)
+            try:
+                result = await self.post_process(
+                    temp_download_path, final_download_path, filename,
+                    overwrite, auto_extract_zip, combined_progress_callback, digests, timings, throttle, expected_sha256
+                )
+            except ChecksumMismatch:
+                self.remove_file(temp_download_path)
+                raise
+            
+            combined_progress_callback("Download completed!", 100)
+            if session_id:
+                self.progress.publish(session_id, {"status": "completed", "message": result["message"], "percentage": 100})
+            return finish(result)
                 
-                try:
-                    final_path, extract_success = self.extract_zip_file(
-                        temp_download_path, 
-                        final_download_path,
-                        filename
-                    )
-                    
-                    # Clean up temporary zip file
-                    temp_download_path.unlink()
-                    
-                    if extract_success:
-                        if self.is_pth_file(filename):
-                            combined_progress_callback("PyTorch model extracted and validated!", 95)
-                        else:
-                            combined_progress_callback("Extraction completed!", 95)
-                        
-                        success_message = "Download and extraction completed successfully"
-                        if self.is_pth_file(filename):
-                            success_message = "PyTorch model downloaded and validated successfully"
-                        
-                        if session_id:
-                            progress_store[session_id] = {"status": "completed", "message": success_message, "percentage": 100}
-                            
-                        return {"success": True, "file_path": final_path, "message": success_message}
-                    else:
-                        # Move zip file to final location as fallback
-                        temp_download_path.rename(final_download_path)
-                        fallback_message = "Download completed (extraction failed, kept as zip)"
-                        if session_id:
-                            progress_store[session_id] = {"status": "completed", "message": fallback_message, "percentage": 100}
-                        return {"success": True, "file_path": str(final_download_path), "message": fallback_message}
-                        
-                except Exception as e:
-                    # Move zip file to final location as fallback
-                    if temp_download_path.exists():
-                        temp_download_path.rename(final_download_path)
-                    error_message = f"Download completed (extraction error: {e})"
-                    if session_id:
-                        progress_store[session_id] = {"status": "completed", "message": error_message, "percentage": 100}
-                    return {"success": True, "file_path": str(final_download_path), "message": error_message}
+        except Exception as e:
+            error_message = f"Error: {e}"
+            if session_id:
+                self.progress.publish(session_id, {"status": "error", "message": error_message, "percentage": 0})
+            if progress_callback:
+                progress_callback(error_message)
+            return finish({"success": False, "error": str(e)}, cause=type(e).__name__)
+        finally:
+            if destination_lock:
+                destination_lock.release()
+
+    async def download_folder_async(self, google_drive_url, filename="", model_type="checkpoints", custom_path="", overwrite=False, auto_extract_zip=True, progress_callback=None, session_id=None, max_workers=FOLDER_DOWNLOAD_WORKERS, throttle=None):
+        """Download a shared folder, mirroring its tree under the model directory"""
+        try:
+            folder_id = extract_folder_id(google_drive_url)
+            if not folder_id:
+                raise ValueError(f"Could not extract folder ID from URL: {google_drive_url}")
             
-            else:
-                # Not a zip file or extraction disabled
-                if final_download_path.exists() and overwrite:
-                    final_download_path.unlink()
+            self.progress.publish(session_id, {"status": "starting", "message": "Listing folder contents...", "percentage": 0})
+            if progress_callback:
+                progress_callback("Listing folder contents...")
+            
+            async with self.http_downloader.open_session() as session:
+                files = await walk_folder(session, folder_id)
+            if not files:
+                raise DriveFolderError(f"Folder {folder_id} contains no files")
+            
+            root = self.get_destination_dir(model_type, custom_path)
+            if filename:
+                root = root / safe_name(filename)
+            print(f"📂 Folder contains {len(files)} file(s), saving to: {root}")
+            
+            total = len(files)
+            counts = {"downloaded": 0, "skipped": 0, "failed": 0}
+            failures = []
+            slots = asyncio.Semaphore(max_workers)
+            
+            def report(message):
+                finished = sum(counts.values())
+                self.progress.publish(session_id, {
+                    "status": "progress",
+                    "message": f"[{finished}/{total}] {message}",
+                    "percentage": finished / total * 100
+                })
+                if progress_callback:
+                    progress_callback(message)
+            
+            async def fetch(file_id, relative):
+                dest = root.joinpath(*relative.parts)
+                if dest.exists() and not overwrite:
+                    counts["skipped"] += 1
+                    report(f"Skipped existing {relative}")
+                    return
                 
-                temp_download_path.rename(final_download_path)
+                async with slots:
+                    dest.parent.mkdir(parents=True, exist_ok=True)
+                    result = await self.download_file_async(
+                        f"https://drive.google.com/file/d/{file_id}/view",
+                        dest.name, "custom", str(dest.parent), overwrite, auto_extract_zip, throttle=throttle
+                    )
                 
-                # Validate .pth files even when not extracted from zip
-                if self.is_pth_file(filename):
-                    combined_progress_callback("Validating PyTorch model...", 90)
-                    
-                    if self.validate_pth_file(final_download_path):
-                        success_message = f"PyTorch model downloaded and validated successfully ({file_size} bytes)"
-                    else:
-                        success_message = f"PyTorch model downloaded but validation failed ({file_size} bytes)"
+                if result.get("success"):
+                    counts["downloaded"] += 1
+                    report(f"Downloaded {relative}")
                 else:
-                    success_message = f"Download completed successfully ({file_size} bytes)"
-                
-                combined_progress_callback("Download completed!", 100)
-                if session_id:
-                    progress_store[session_id] = {"status": "completed", "message": success_message, "percentage": 100}
-                return {"success": True, "file_path": str(final_download_path), "message": success_message}
-                
+                    counts["failed"] += 1
+                    failures.append(f"{relative}: {result.get('error')}")
+                    report(f"Failed {relative}")
+            
+            await asyncio.gather(*(fetch(file_id, relative) for file_id, relative in files))
+            
+            message = (f"Folder download finished: {counts['downloaded']} downloaded, "
+                       f"{counts['skipped']} skipped, {counts['failed']} failed")
+            result = {"success": not failures, "file_path": str(root), "message": message, "files": dict(counts, total=total)}
+            if failures:
+                result["error"] = "; ".join(failures[:5])
+            
+            self.progress.publish(session_id, {"status": "error" if failures else "completed", "message": message, "percentage": 100})
+            return result
+            
         except Exception as e:
             error_message = f"Error: {e}"
-            if session_id:
-                progress_store[session_id] = {"status": "error", "message": error_message, "percentage": 0}
+            self.progress.publish(session_id, {"status": "error", "message": error_message, "percentage": 0})
             if progress_callback:
                 progress_callback(error_message)
             return {"success": False, "error": str(e)}
 
-    async def download_with_playwright(self, file_id, download_path, progress_callback=None):
+    async def plan_batch_async(self, entries, overwrite=False):
+        """Resolve destinations and sizes for a batch, marking files already present as skipped"""
+        probes = asyncio.Semaphore(BATCH_DOWNLOAD_WORKERS * 2)
+        
+        async def plan(entry):
+            item = dict(entry, size=None, skip=False)
+            if self.is_folder_url(entry['google_drive_url']):
+                item['path'] = str(self.get_destination_dir(entry['model_type'], entry['custom_path']) / entry['filename'])
+                return item
+            path = self.get_download_path(entry['model_type'], entry['custom_path'], entry['filename'])
+            item['path'] = str(path)
+            if path.exists() and not overwrite and self.is_present(path, entry.get('sha256')):
+                item['skip'] = True
+                item['size'] = path.stat().st_size
+                return item
+            try:
+                async with probes:
+                    item['size'] = await self.http_downloader.probe(self.extract_file_id(entry['google_drive_url']))
+            except (DriveHTTPError, aiohttp.ClientError, asyncio.TimeoutError) as e:
+                # Size stays unknown; the download itself may still succeed via Playwright
+                print(f"⚠️ Could not determine size of {entry['filename']}: {e}")
+            return item
+        
+        items = await asyncio.gather(*(plan(entry) for entry in entries))
+        to_fetch = order_by_size([item for item in items if not item['skip']])
+        skipped = [item for item in items if item['skip']]
+        return {
+            "items": to_fetch,
+            "skipped": skipped,
+            "total_bytes": sum(item['size'] or 0 for item in to_fetch),
+            "unknown_sizes": sum(1 for item in to_fetch if item['size'] is None),
+            "space_shortfalls": check_free_space(to_fetch)
+        }
+
+    async def download_batch_async(self, entries, overwrite=False, auto_extract_zip=True, session_id=None, plan=None, throttle=None):
+        """Download a planned set of files with bounded concurrency and one aggregate progress stream"""
+        throttle = throttle or self.limiter.job()
+        try:
+            if plan is None:
+                self.progress.publish(session_id, {"status": "starting", "message": "Planning batch download...", "percentage": 0})
+                plan = await self.plan_batch_async(entries, overwrite)
+            if plan["space_shortfalls"]:
+                raise OSError(f"Not enough free disk space: {'; '.join(plan['space_shortfalls'])}")
+            
+            items = plan["items"]
+            total_files = len(items)
+            total_bytes = plan["total_bytes"]
+            bytes_done = {}
+            results = []
+            slots = asyncio.Semaphore(BATCH_DOWNLOAD_WORKERS)
+            
+            def report(message):
+                done_bytes = sum(bytes_done.values())
+                finished = len(results)
+                if total_bytes:
+                    percentage = min(done_bytes / total_bytes, 1.0) * 100
+                else:
+                    percentage = finished / max(total_files, 1) * 100
+                self.progress.publish(
+                    session_id,
+                    {"status": "progress", "message": f"[{finished}/{total_files}] {message}", "percentage": percentage},
+                    done_bytes, total_bytes or None
+                )
+            
+            async def fetch(index, item):
+                def on_bytes(done, total):
+                    bytes_done[index] = done
+                    report(f"Downloading {item['filename']}")
+                
+                async with slots:
+                    params = dict(
+                        google_drive_url=item['google_drive_url'], filename=item['filename'],
+                        model_type=item['model_type'], custom_path=item['custom_path'],
+                        overwrite=overwrite, auto_extract_zip=auto_extract_zip, throttle=throttle
+                    )
+                    if self.is_folder_url(item['google_drive_url']):
+                        result = await self.download_folder_async(**params)
+                    else:
+                        result = await self.download_file_async(**params, on_bytes=on_bytes, expected_sha256=item['sha256'])
+                
+                if item['size']:
+                    bytes_done[index] = item['size']
+                results.append(dict(result, filename=item['filename']))
+                report(f"{'Finished' if result.get('success') else 'Failed'} {item['filename']}")
+            
+            await asyncio.gather(*(fetch(index, item) for index, item in enumerate(items)))
+            
+            failed = [result for result in results if not result.get('success')]
+            message = (f"Batch finished: {len(results) - len(failed)} downloaded, "
+                       f"{len(plan['skipped'])} already present, {len(failed)} failed")
+            self.progress.publish(session_id, {"status": "error" if failed else "completed", "message": message, "percentage": 100})
+            return {
+                "success": not failed,
+                "message": message,
+                "results": results,
+                "skipped": [item['path'] for item in plan['skipped']],
+                **({"error": "; ".join(f"{r['filename']}: {r.get('error')}" for r in failed[:5])} if failed else {})
+            }
+        
+        except Exception as e:
+            error_message = f"Error: {e}"
+            self.progress.publish(session_id, {"status": "error", "message": error_message, "percentage": 0})
+            return {"success": False, "error": str(e)}
+
+    async def fetch_shared(self, file_id, download_path, progress_callback=None, expected_sha256=None, timings=None, throttle=None,
+                           use_cache=True):
+        """Fetch a file into a temp path this caller owns, sharing one transfer per file ID"""
+        flight = self.inflight.get(file_id)
+        if flight is None or flight.abandoned:
+            flight = SharedFetch(file_id)
+            self.inflight[file_id] = flight
+            flight.task = asyncio.ensure_future(
+                self.fetch_locked(file_id, download_path, flight.notify, expected_sha256, timings, throttle, use_cache)
+            )
+            flight.task.add_done_callback(
+                lambda _: self.inflight.pop(file_id) if self.inflight.get(file_id) is flight else None
+            )
+        else:
+            print(f"🔗 Joining the download of {file_id} already in progress")
+            if progress_callback:
+                progress_callback("Joined a download of the same file already in progress", 16)
+
+        success, temp_download_path, digests = await flight.result(progress_callback)
+        if not success or not temp_download_path.exists():
+            flight.release()
+            return False, temp_download_path, None
+
+        # Callers may write to other directories, each gets its copy staged next to its own destination
+        private_path = self.get_temp_download_path(file_id, download_path.parent, uuid.uuid4().hex[:8])
+        temp_download_path = await flight.claim(
+            temp_download_path, private_path,
+            lambda source, dest: self.pipeline.run_stage("Sharing download", link_or_copy, source, dest, start=69, timings=timings)
+        )
+        return True, temp_download_path, digests
+
+    async def fetch_locked(self, file_id, download_path, progress_callback=None, expected_sha256=None, timings=None, throttle=None,
+                           use_cache=True):
+        """Restore or download a file and hash it, holding the inter-process lock for its file ID"""
+        file_lock = FileLock.for_key(self.lock_dir, f"file:{file_id}")
+        with StageTimer(timings, "file_lock"):
+            await file_lock.acquire(
+                on_wait=lambda: progress_callback("Waiting for another ComfyUI process downloading this file...", 15)
+            )
+        try:
+            # The cache index is re-read here, so a file another process just fetched is picked up
+            hasher = StreamHasher(self.hash_algorithms)
+            if use_cache:
+                success, temp_download_path, digests = await self.restore_from_cache(
+                    file_id, download_path, progress_callback, expected_sha256, timings
+                )
+            else:
+                success, temp_download_path, digests = False, self.get_temp_download_path(file_id, download_path.parent), None
+            from_cache = success
+
+            if not success:
+                success, suggested_filename, temp_download_path = await self.fetch_file(
+                    file_id, download_path, progress_callback, hasher, timings, throttle
+                )
+
+            if success and temp_download_path.exists() and digests is None:
+                if hasher.bytes_hashed != temp_download_path.stat().st_size:
+                    # Parallel, resumed or browser downloads: hash whatever was not seen inline
+                    digests = await self.pipeline.run_stage(
+                        "Computing checksum", hash_file, temp_download_path, hasher,
+                        start=66, end=68, progress_callback=progress_callback, with_context=True, timings=timings
+                    )
+                else:
+                    digests = hasher.hexdigests()
+
+                if self.cache and not from_cache:
+                    await self.pipeline.run_stage(
+                        "Adding to download cache", self.cache.store, file_id, temp_download_path, digests['sha256'],
+                        start=69, progress_callback=progress_callback, timings=timings
+                    )
+
+            return success, temp_download_path, digests
+        finally:
+            file_lock.release()
+
+    async def restore_from_cache(self, file_id, download_path, progress_callback=None, expected_sha256=None, timings=None):
+        """Serve a previously downloaded file from the cache if it still matches the remote file"""
+        temp_download_path = self.get_temp_download_path(file_id, download_path.parent)
+        if not self.cache:
+            return False, temp_download_path, None
+        
+        entry = await self.pipeline.run_stage(
+            "Checking download cache", self.cache.lookup, file_id, start=16, timings=timings, light=True
+        )
+        if entry is not None:
+            entry = await self.current_cache_entry(file_id, entry, expected_sha256, timings)
+        if entry is None:
+            self.metrics.cache_misses.inc()
+            return False, temp_download_path, None
+        # The expected hash is of the final file, a cached zip may still extract to it
+        if expected_sha256 and entry.get("sha256") and entry["sha256"] != expected_sha256:
+            is_zip = await self.pipeline.run_stage(
+                "Checking cached archive", self.is_zip_file, self.cache.cache_dir / entry["blob"], start=18, timings=timings, light=True
+            )
+            if not is_zip:
+                print(f"⚠️ Cached copy of {file_id} does not match the expected SHA-256, downloading instead")
+                return False, temp_download_path, None
+        
+        try:
+            await self.pipeline.run_stage(
+                "Restoring from download cache", self.cache.materialize, entry, temp_download_path,
+                start=20, end=65, progress_callback=progress_callback, timings=timings
+            )
+            PartialManifest.discard(temp_download_path)
+            self.metrics.cache_hits.inc()
+            self.metrics.bytes.inc(entry["size"], source="cache")
+            digests = {"sha256": entry["sha256"]} if entry.get("sha256") else None
+            return True, temp_download_path, digests
+        except OSError as e:
+            print(f"⚠️ Could not restore {file_id} from cache ({e}), downloading instead")
+            return False, temp_download_path, None
+
+    async def current_cache_entry(self, file_id, entry, expected_sha256=None, timings=None):
+        """The cache entry matching the remote file's current size, or None if the cached copies are stale"""
+        try:
+            with StageTimer(timings, "cache_probe"):
+                remote_size = await self.http_downloader.probe(file_id)
+        except (DriveHTTPError, aiohttp.ClientError, asyncio.TimeoutError) as e:
+            print(f"⚠️ Could not check the size of {file_id} ({e})")
+            remote_size = None
+        
+        if remote_size is None:
+            if expected_sha256 and entry.get("sha256") == expected_sha256:
+                return entry
+            print(f"⚠️ Cannot tell whether the cached copy of {file_id} is current, downloading instead")
+            return None
+        if entry["size"] == remote_size:
+            return entry
+        entry = await self.pipeline.run_stage(
+            "Checking download cache", self.cache.lookup, file_id, remote_size, timings=timings, light=True
+        )
+        if entry is None:
+            print(f"⚠️ {file_id} changed on Google Drive since it was cached, downloading the new version")
+        return entry
+
+    def get_temp_download_path(self, file_id, directory, tag=None):
+        """Hidden staging file in the destination directory, so the final move is an atomic rename"""
+        name = f"gdrive_{file_id}.{tag}" if tag else f"gdrive_{file_id}"
+        return staging_path(directory, name)
+
+    def retry_reporter(self, progress_callback=None):
+        """``on_retry`` hook telling the user a stage is being retried"""
+        def on_retry(stage, attempt, delay, error):
+            self.metrics.retries.inc(stage=stage, cause=type(error).__name__)
+            if progress_callback:
+                progress_callback(f"{stage} failed, retrying in {delay:.0f}s (attempt {attempt + 1})")
+        return on_retry
+
+    async def fetch_file(self, file_id, download_path, progress_callback=None, hasher=None, timings=None, throttle=None):
+        """Download with the HTTP engine, using Playwright only if it cannot get past Drive's pages"""
+        temp_download_path = self.get_temp_download_path(file_id, download_path.parent)
+        
+        stats = {}  # Shared by all attempts, so bytes of failed ones are counted too
+        try:
+            with StageTimer(timings, "http_download"):
+                suggested_filename, size = await self.retry_policies["http"].run(
+                    "HTTP download", self.http_downloader.download, file_id, temp_download_path, progress_callback,
+                    hasher=hasher, stats=stats, throttle=throttle, retry_if=is_transient, on_retry=self.retry_reporter(progress_callback)
+                )
+            if progress_callback:
+                progress_callback("Download completed!", 65)
+            return True, suggested_filename, temp_download_path
+        except DownloadInterrupted:
+            # Partial data is on disk with its manifest, a later attempt resumes instead of using the browser
+            raise
+        except (DriveHTTPError, aiohttp.ClientError, asyncio.TimeoutError) as e:
+            print(f"⚠️ HTTP download failed ({e}), falling back to Playwright")
+            if hasher:
+                hasher.reset()
+            if temp_download_path.exists() and not PartialManifest.exists(temp_download_path):
+                temp_download_path.unlink()
+        finally:
+            self.record_transfer("http", stats, timings)
+        
+        with StageTimer(timings, "browser_download"):
+            return await self.retry_policies["browser"].run(
+                "Browser download", self.download_with_playwright, file_id, download_path, progress_callback,
+                retry_if=lambda e: not isinstance(e, DriveHTTPError) or is_transient(e),
+                on_retry=self.retry_reporter(progress_callback), timings=timings, throttle=throttle
+            )
+
+    def record_transfer(self, engine, stats, timings=None):
+        """Fold a transfer's ``stats`` (all its attempts, successful or not) into the metrics and the job's timings"""
+        if "ttfb" not in stats:
+            # Never got as far as a file response
+            return
+        self.metrics.ttfb.observe(stats["ttfb"], engine=engine)
+        self.metrics.bytes.inc(stats["bytes"], source=engine)
+        if stats["transfer"] > 0 and stats["bytes"]:
+            self.metrics.throughput.observe(stats["bytes"] / stats["transfer"], engine=engine)
+        if timings is not None:
+            timings["ttfb"] = stats["ttfb"]
+            timings["transfer"] = timings.get("transfer", 0) + stats["transfer"]
+
+    async def click_download_button(self, page):
+        """Click whichever of Drive's download buttons the page shows, returning whether one was found"""
+        for selector in DOWNLOAD_BUTTON_SELECTORS:
+            element = page.locator(selector).first
+            try:
+                if await element.count() > 0:
+                    await element.click()
+                    return True
+            except PlaywrightError as e:
+                # Clicking may navigate straight into the download
+                print(f"⚠️ Clicking {selector} raised: {e}")
+                return True
+        return False
+
+    async def wait_for_browser_download(self, download, dest_path, progress_callback=None, files_before=()):
+        """Let the browser finish a download, failing once its file stops growing for the stall timeout"""
+        stall_timeout = self.http_downloader.stall_timeout
+        loop = asyncio.get_event_loop()
+        save = asyncio.ensure_future(download.save_as(dest_path))
+        last_bytes, last_change = None, loop.time()
+        own_file = None
+        try:
+            while True:
+                done, _ = await asyncio.wait([save], timeout=BROWSER_STALL_CHECK_INTERVAL)
+                if done:
+                    save.result()
+                    return
+                if own_file is None:
+                    own_file = self.browser_manager.claim_download_file(files_before)
+                current = self.browser_manager.download_file_bytes(own_file) if own_file else 0
+                if current != last_bytes:
+                    last_bytes, last_change = current, loop.time()
+                    if progress_callback:
+                        progress_callback(f"Downloading in browser... {current} bytes received", 45)
+                elif loop.time() - last_change > stall_timeout:
+                    raise DownloadStalled(f"Browser download received no data for {stall_timeout}s")
+        finally:
+            if own_file is not None:
+                self.browser_manager.release_download_file(own_file)
+            if not save.done():
+                save.cancel()
+                try:
+                    await download.cancel()
+                except PlaywrightError:
+                    pass
+
+    async def download_with_playwright(self, file_id, download_path, progress_callback=None, timings=None, throttle=None):
         """Download file using Playwright with progress callbacks"""
-        download_url = f"https://drive.google.com/uc?export=download&id={file_id}"
+        download_url = self.http_downloader.download_url.format(file_id=file_id)
         
         # Use temporary file for potential zip downloads
-        temp_dir = Path(tempfile.gettempdir())
-        temp_download_path = temp_dir / f"gdrive_temp_{file_id}.tmp"
+        temp_download_path = self.get_temp_download_path(file_id, download_path.parent)
         
         if progress_callback:
             progress_callback("Starting download...", 20)
         
-        async with async_playwright() as p:
-            browser = await p.chromium.launch(
-                headless=True,
-                args=['--no-sandbox', '--disable-setuid-sandbox']
-            )
+        started = time.monotonic()
+        async with self.browser_manager.context() as context:
+            page = await context.new_page()
+            if timings is not None:
+                timings["browser_startup"] = timings.get("browser_startup", 0) + time.monotonic() - started
+            download_started = asyncio.get_event_loop().create_future()
+            
+            def handle_download(download):
+                if not download_started.done():
+                    download_started.set_result(download)
+            
+            page.on("download", handle_download)
+            # Files already in the downloads folder belong to other downloads
+            files_before = self.browser_manager.download_files()
+            
+            if progress_callback:
+                progress_callback("Connecting to Google Drive...", 25)
+            
+            try:
+                await page.goto(download_url, wait_until="domcontentloaded")
+            except PlaywrightError as e:
+                # Navigating straight into a file download aborts the navigation
+                if not download_started.done():
+                    print(f"⚠️ Navigation to Google Drive failed: {e}")
+            
+            # Large files show a virus-scan warning with a "Download anyway" button
+            if not download_started.done():
+                if progress_callback:
+                    progress_callback("Looking for download button...", 35)
+                await self.click_download_button(page)
             
             try:
-                context = await browser.new_context(
-                    user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+                download = await asyncio.wait_for(asyncio.shield(download_started), BROWSER_DOWNLOAD_START_TIMEOUT)
+            except asyncio.TimeoutError:
+                download = None
+            
+            if download is not None:
+                if progress_callback:
+                    progress_callback("Download started...", 30)
+                first_byte = time.monotonic()
+                await self.wait_for_browser_download(download, temp_download_path, progress_callback, files_before)
+                PartialManifest.discard(temp_download_path)
+                self.record_transfer("browser", {
+                    "ttfb": first_byte - started,
+                    "transfer": time.monotonic() - first_byte,
+                    "bytes": temp_download_path.stat().st_size,
+                }, timings)
+                if progress_callback:
+                    progress_callback("Download completed!", 65)
+                return True, download.suggested_filename, temp_download_path
+            
+            if progress_callback:
+                progress_callback("Trying direct download...", 40)
+            # Fallback: stream the file over HTTP with the cookies the browser collected
+            cookies = {c['name']: c['value'] for c in await context.cookies()}
+            stats = {}
+            try:
+                suggested_filename, _ = await self.http_downloader.download(
+                    file_id, temp_download_path, progress_callback, url=download_url, cookies=cookies, stats=stats,
+                    throttle=throttle
                 )
-                
-                page = await context.new_page()
-                
-                download_info = {"path": None, "completed": False, "filename": None}
-                
-                async def handle_download(download):
-                    if progress_callback:
-                        progress_callback("Download started...", 30)
-                    await download.save_as(temp_download_path)
-                    download_info["path"] = temp_download_path
-                    download_info["filename"] = download.suggested_filename
-                    download_info["completed"] = True
-                    if progress_callback:
-                        progress_callback("Download completed!", 65)
-                
-                page.on("download", handle_download)
-                
                 if progress_callback:
-                    progress_callback("Connecting to Google Drive...", 25)
-                
-                await page.goto(download_url, wait_until="networkidle")
-                
-                # Handle different Google Drive download scenarios
-                if not download_info["completed"]:
-                    if progress_callback:
-                        progress_callback("Looking for download button...", 35)
-                    
-                    # Look for download button (large files)
-                    download_button = page.locator('a:has-text("Download anyway")')
-                    if await download_button.count() > 0:
-                        await download_button.click()
-                        await page.wait_for_timeout(2000)
-                    
-                    # Alternative download button selectors
-                    if not download_info["completed"]:
-                        selectors = [
-                            '[aria-label="Download"]',
-                            'a[href*="export=download"]',
-                            '#uc-download-link'
-                        ]
-                        
-                        for selector in selectors:
-                            element = page.locator(selector)
-                            if await element.count() > 0:
-                                await element.click()
-                                break
-                
-                # Wait for download to complete
-                timeout = 60000  # 60 seconds for large files
-                elapsed = 0
-                while not download_info["completed"] and elapsed < timeout:
-                    await page.wait_for_timeout(1000)
-                    elapsed += 1000
-                    if progress_callback and elapsed % 5000 == 0:
-                        percentage = min(35 + (elapsed / timeout) * 30, 65)  # Progress from 35% to 65%
-                        progress_callback(f"Waiting for download... ({elapsed//1000}s)", percentage)
-                
-                if not download_info["completed"]:
-                    if progress_callback:
-                        progress_callback("Trying direct download...", 40)
-                    # Fallback: try to get file content directly
-                    response = await page.goto(download_url)
-                    if response and response.status == 200:
-                        content = await response.body()
-                        async with aiofiles.open(temp_download_path, 'wb') as f:
-                            await f.write(content)
-                        download_info["completed"] = True
-                        if progress_callback:
-                            progress_callback("Direct download completed!", 65)
-                
+                    progress_callback("Direct download completed!", 65)
+                return True, suggested_filename, temp_download_path
+            except (DriveHTTPError, aiohttp.ClientError, asyncio.TimeoutError) as e:
+                print(f"❌ Direct download failed: {e}")
             finally:
-                await browser.close()
+                self.record_transfer("http", stats, timings)
         
-        return download_info["completed"], download_info.get("filename", ""), temp_download_path
+        return False, "", temp_download_path
 
 # Initialize the API
 google_drive_api = GoogleDriveDownloaderAPI()
 
+async def run_download_job(**params):
+    """Queue runner: a download job, with cancellation reported to the progress store"""
+    session_id = params.get('session_id')
+    try:
+        if google_drive_api.is_folder_url(params['google_drive_url']):
+            # File-only options; a folder's files are not checked against one hash
+            params.pop('include_timings', None)
+            params.pop('expected_sha256', None)
+            return await google_drive_api.download_folder_async(**params)
+        return await google_drive_api.download_file_async(**params)
+    except asyncio.CancelledError:
+        google_drive_api.metrics.failures.inc(cause="cancelled")
+        if session_id:
+            google_drive_api.progress.publish(session_id, {"status": "error", "message": "Download cancelled", "percentage": 0})
+        raise
+
+download_queue = DownloadQueue(run_download_job)
+
 @server.PromptServer.instance.routes.post("/google_drive_download")
 async def download_google_drive_file(request):
-    """API endpoint for Google Drive downloads"""
+    """API endpoint for Google Drive downloads, queued and optionally answered with just the job ID"""
     try:
         data = await request.json()
         session_id = data.get('session_id')
@@ -416,19 +954,38 @@ async def download_google_drive_file(request):
                     status=400
                 )
         
-        result = await google_drive_api.download_file_async(
+        try:
+            priority = int(data.get('priority', 0))
+        except (ValueError, TypeError) as e:
+            return server.web.json_response({"success": False, "error": f"Invalid priority: {e}"}, status=400)
+        try:
+            limits = {key: parse_rate(data.get(field)) for key, field in RATE_FIELDS.items()}
+        except (ValueError, TypeError) as e:
+            return server.web.json_response({"success": False, "error": f"Invalid limits: {e}"}, status=400)
+        
+        params = dict(
             google_drive_url=data['google_drive_url'],
             filename=data['filename'],
             model_type=data['model_type'],
             custom_path=data.get('custom_path', ''),
             overwrite=data.get('overwrite', False),
             auto_extract_zip=data.get('auto_extract_zip', True),
-            session_id=session_id
+            session_id=session_id,
+            expected_sha256=data.get('sha256'),
+            include_timings=bool(data.get('timings', False)),
+            throttle=google_drive_api.limiter.job(**limits)
         )
+        destination = str(google_drive_api.get_destination_dir(params['model_type'], params['custom_path']))
+        job = download_queue.submit(params, priority=priority, destination=destination)
+        
+        position = download_queue.position(job)
+        if session_id and position:
+            google_drive_api.progress.publish(session_id, {"status": "queued", "message": f"Queued (position {position})", "percentage": 0})
         
-        # Clean up progress store after completion
-        if session_id and session_id in progress_store:
-            del progress_store[session_id]
+        if data.get('async', False):
+            return server.web.json_response({"success": True, "job_id": job.job_id, "status": job.status, "position": position})
+        
+        result = await download_queue.wait(job)
         
         return server.web.json_response(result)
         
@@ -438,6 +995,127 @@ async def download_google_drive_file(request):
             status=500
         )
 
+@server.PromptServer.instance.routes.post("/google_drive_batch")
+async def download_google_drive_batch(request):
+    """API endpoint to provision a list or manifest of files as one queued batch job"""
+    try:
+        data = await request.json()
+        entries = parse_manifest(data)
+    except (ManifestError, ValueError) as e:
+        return server.web.json_response({"success": False, "error": str(e)}, status=400)
+    
+    options = data if isinstance(data, dict) else {}
+    try:
+        priority = int(options.get('priority', 0))
+    except (ValueError, TypeError) as e:
+        return server.web.json_response({"success": False, "error": f"Invalid priority: {e}"}, status=400)
+    try:
+        limits = {key: parse_rate(options.get(field)) for key, field in RATE_FIELDS.items()}
+    except (ValueError, TypeError) as e:
+        return server.web.json_response({"success": False, "error": f"Invalid limits: {e}"}, status=400)
+    
+    try:
+        overwrite = options.get('overwrite', False)
+        session_id = options.get('session_id')
+        
+        plan = await google_drive_api.plan_batch_async(entries, overwrite)
+        if options.get('dry_run', False):
+            return server.web.json_response({"success": not plan["space_shortfalls"], "plan": plan})
+        
+        params = dict(
+            entries=entries,
+            overwrite=overwrite,
+            auto_extract_zip=options.get('auto_extract_zip', True),
+            session_id=session_id,
+            plan=plan,
+            throttle=google_drive_api.limiter.job(**limits)
+        )
+        job = download_queue.submit(
+            params, priority=priority, runner=google_drive_api.download_batch_async
+        )
+        
+        if options.get('async', False):
+            return server.web.json_response({"success": True, "job_id": job.job_id, "status": job.status, "plan": plan})
+        
+        return server.web.json_response(await download_queue.wait(job))
+        
+    except Exception as e:
+        return server.web.json_response(
+            {"success": False, "error": str(e)}, 
+            status=500
+        )
+
+@server.PromptServer.instance.routes.get("/google_drive_jobs")
+async def list_download_jobs(request):
+    """API endpoint listing queued, running and recently finished jobs"""
+    return server.web.json_response({
+        "jobs": download_queue.list(),
+        "running": download_queue.running,
+        "queued": download_queue.depth
+    })
+
+@server.PromptServer.instance.routes.get("/google_drive_jobs/{job_id}")
+async def get_download_job(request):
+    """API endpoint to get a single job"""
+    job = download_queue.get(request.match_info['job_id'])
+    if job is None:
+        return server.web.json_response({"success": False, "error": "Job not found"}, status=404)
+    return server.web.json_response(job.to_dict(download_queue.position(job)))
+
+@server.PromptServer.instance.routes.post("/google_drive_jobs/{job_id}/cancel")
+async def cancel_download_job(request):
+    """API endpoint to cancel a queued or running job"""
+    if not download_queue.cancel(request.match_info['job_id']):
+        return server.web.json_response({"success": False, "error": "Job not found or already finished"}, status=404)
+    return server.web.json_response({"success": True})
+
+@server.PromptServer.instance.routes.post("/google_drive_jobs/{job_id}/priority")
+async def reorder_download_job(request):
+    """API endpoint to change the priority of a queued job"""
+    try:
+        data = await request.json()
+        priority = int(data['priority'])
+    except (ValueError, KeyError, TypeError) as e:
+        return server.web.json_response({"success": False, "error": f"Invalid priority: {e}"}, status=400)
+    if not download_queue.set_priority(request.match_info['job_id'], priority):
+        return server.web.json_response({"success": False, "error": "Job not found or already started"}, status=404)
+    return server.web.json_response({"success": True})
+
+@server.PromptServer.instance.routes.post("/google_drive_jobs/{job_id}/limits")
+async def limit_download_job(request):
+    """API endpoint to change a queued or running job's ``max_network_rate``/``max_disk_rate`` (bytes/s)"""
+    job = download_queue.get(request.match_info['job_id'])
+    throttle = job.params.get('throttle') if job is not None else None
+    if throttle is None or job.finished:
+        return server.web.json_response({"success": False, "error": "Job not found or already finished"}, status=404)
+    try:
+        data = await request.json()
+        changes = {key: parse_rate(data[field]) for key, field in RATE_FIELDS.items() if field in data}
+    except (ValueError, TypeError, AttributeError) as e:
+        return server.web.json_response({"success": False, "error": f"Invalid limits: {e}"}, status=400)
+    throttle.configure(**changes)
+    return server.web.json_response({"success": True, "limits": throttle.to_dict()})
+
+@server.PromptServer.instance.routes.get("/google_drive_limits")
+async def get_download_limits(request):
+    """API endpoint returning the global bandwidth limits and yield mode"""
+    return server.web.json_response(google_drive_api.limiter.to_dict())
+
+@server.PromptServer.instance.routes.post("/google_drive_limits")
+async def set_download_limits(request):
+    """API endpoint to change the global bandwidth limits and yield mode; omitted fields are kept"""
+    try:
+        data = await request.json()
+        changes = {key: parse_rate(data[field]) for key, field in RATE_FIELDS.items() if field in data}
+        if 'yield_rate' in data:
+            changes['yield_rate'] = parse_rate(data['yield_rate'])
+        if 'yield_while_executing' in data:
+            changes['yield_while_executing'] = bool(data['yield_while_executing'])
+    except (ValueError, TypeError, AttributeError) as e:
+        return server.web.json_response({"success": False, "error": f"Invalid limits: {e}"}, status=400)
+    google_drive_api.limiter.configure(**changes)
+    return server.web.json_response(dict(google_drive_api.limiter.to_dict(), success=True))
+
 @server.PromptServer.instance.routes.get("/google_drive_progress/{session_id}")
 async def get_download_progress(request):
     """API endpoint to get download progress"""
@@ -450,3 +1128,24 @@ async def get_download_progress(request):
             {"status": "error", "message": str(e)}, 
             status=500
         )
+
+@server.PromptServer.instance.routes.get("/google_drive_metrics")
+async def get_download_metrics(request):
+    """Downloader metrics in Prometheus text format, or as JSON with ``?format=json``"""
+    try:
+        metrics = google_drive_api.metrics
+        metrics.queue_depth.set(download_queue.depth)
+        metrics.running_jobs.set(download_queue.running)
+        metrics.active_transfers.set(len(google_drive_api.inflight))
+        
+        if request.query.get('format') == 'json' or 'application/json' in request.headers.get('Accept', ''):
+            return server.web.json_response(metrics.to_dict())
+        return server.web.Response(
+            text=metrics.render_prometheus(),
+            headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"}
+        )
+    except Exception as e:
+        return server.web.json_response(
+            {"success": False, "error": str(e)}, 
+            status=500
+        )
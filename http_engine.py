@@ -0,0 +1,429 @@
+import os
+import re
+import time
+import html
+import asyncio
+import aiohttp
+import aiofiles
+from urllib.parse import urljoin, urlencode
+
+from .browser_pool import DEFAULT_USER_AGENT
+from .resume import PartialManifest
+from .staging import ensure_free_space, preallocate
+
+DRIVE_DOWNLOAD_URL = "https://drive.google.com/uc?export=download&id={file_id}"
+CHUNK_SIZE = 1024 * 1024  # 1 MiB
+MAX_INTERSTITIAL_BYTES = 2 * 1024 * 1024
+PARALLEL_THRESHOLD = 256 * 1024 * 1024  # Files above this are fetched as parallel ranges
+PARALLEL_CONNECTIONS = 4
+CHECKPOINT_BYTES = 64 * 1024 * 1024  # How often a running range is recorded in the manifest
+
+class DriveHTTPError(Exception):
+    """Raised when the HTTP engine cannot get a file out of Google Drive"""
+
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+
+class DownloadInterrupted(DriveHTTPError):
+    """Raised when a transfer fails part-way but its partial data was kept for resuming"""
+
+
+class DownloadStalled(DriveHTTPError):
+    """Raised when a transfer receives no bytes for longer than the stall timeout"""
+
+
+def is_transient(error):
+    """Whether retrying may help: network trouble, stalls, throttling or server errors"""
+    if isinstance(error, (DownloadInterrupted, DownloadStalled, aiohttp.ClientError, asyncio.TimeoutError)):
+        return True
+    if isinstance(error, DriveHTTPError) and error.status is not None:
+        return error.status == 429 or error.status >= 500
+    return False
+
+
+class ProgressTracker:
+    """Merges byte counts from one or more streams into a single progress callback.
+
+    Bytes are also added to ``stats['bytes']`` as they arrive, so a transfer
+    that fails part-way is still counted.
+    """
+
+    def __init__(self, total, progress_callback=None, report_every=4 * CHUNK_SIZE, segments=1, stats=None):
+        self.total = total
+        self.stats = stats
+        self.progress_callback = progress_callback
+        self.report_every = report_every
+        self.segments = segments
+        self.done = 0
+        self._next_report = 0
+
+    def add(self, nbytes):
+        self.done += nbytes
+        if self.stats is not None:
+            self.stats['bytes'] = self.stats.get('bytes', 0) + nbytes
+        if self.progress_callback and self.done >= self._next_report:
+            self._next_report = self.done + self.report_every
+            via = f" over {self.segments} connections" if self.segments > 1 else ""
+            if self.total:
+                percentage = 30 + (self.done / self.total) * 35  # Progress from 30% to 65%
+                self.progress_callback(f"Downloading{via}... {self.done}/{self.total} bytes", percentage,
+                                       bytes_done=self.done, bytes_total=self.total)
+            else:
+                self.progress_callback(f"Downloading{via}... {self.done} bytes", 40, bytes_done=self.done)
+
+
+class HttpDownloader:
+    """Browserless Google Drive downloader built on aiohttp.
+
+    Resolves the ``uc?export=download`` confirm page ("Download anyway") on
+    its own and streams the response body to disk in fixed-size chunks, so
+    memory use stays constant regardless of file size. There is no overall
+    time limit: a transfer only fails once it has received nothing for
+    ``stall_timeout`` seconds.
+    """
+
+    def __init__(self, chunk_size=CHUNK_SIZE, connect_timeout=30, stall_timeout=60,
+                 parallel_threshold=PARALLEL_THRESHOLD, connections=PARALLEL_CONNECTIONS,
+                 download_url=DRIVE_DOWNLOAD_URL):
+        self.chunk_size = chunk_size
+        self.download_url = download_url
+        self.parallel_threshold = parallel_threshold
+        self.connections = connections
+        self.stall_timeout = stall_timeout
+        self.timeout = aiohttp.ClientTimeout(total=None, connect=connect_timeout, sock_read=stall_timeout)
+        self._connector = None
+
+    def _get_connector(self):
+        if self._connector is None or self._connector.closed:
+            self._connector = aiohttp.TCPConnector(limit=32, ttl_dns_cache=300)
+        return self._connector
+
+    def open_session(self, cookies=None):
+        """Per-download session with its own cookie jar on a shared connection pool"""
+        session = aiohttp.ClientSession(
+            connector=self._get_connector(),
+            connector_owner=False,
+            cookie_jar=aiohttp.CookieJar(),
+            timeout=self.timeout,
+            headers={'User-Agent': DEFAULT_USER_AGENT}
+        )
+        if cookies:
+            session.cookie_jar.update_cookies(cookies)
+        return session
+
+    @staticmethod
+    def is_file_response(response):
+        """Drive serves the file itself with a Content-Disposition, pages as text/html"""
+        if 'Content-Disposition' in response.headers:
+            return True
+        return not response.content_type.startswith('text/html')
+
+    @staticmethod
+    def find_confirm_url(page_html, page_url, cookies=None):
+        """Locate the URL behind the virus-scan / "Download anyway" interstitial"""
+        # Current layout: a GET form posting to drive.usercontent.google.com
+        form = re.search(r'<form[^>]*id="download-form"[^>]*>(.*?)</form>', page_html, re.S)
+        if form:
+            action = re.search(r'action="([^"]+)"', form.group(0))
+            if action:
+                params = {}
+                for tag in re.findall(r'<input[^>]*type="hidden"[^>]*>', form.group(1)):
+                    name = re.search(r'name="([^"]*)"', tag)
+                    value = re.search(r'value="([^"]*)"', tag)
+                    if name:
+                        params[html.unescape(name.group(1))] = html.unescape(value.group(1)) if value else ""
+                target = urljoin(page_url, html.unescape(action.group(1)))
+                return f"{target}?{urlencode(params)}" if params else target
+
+        # Legacy layout: a plain link carrying the confirm token
+        link = re.search(r'href="(/uc\?export=download[^"]*confirm=[^"]+)"', page_html)
+        if link:
+            return urljoin(page_url, html.unescape(link.group(1)))
+
+        # Oldest layout: the token only lives in a download_warning cookie
+        for name, value in (cookies or {}).items():
+            if name.startswith('download_warning'):
+                return f"{page_url}&confirm={value}"
+
+        return None
+
+    @staticmethod
+    def describe_error_page(page_html):
+        """Turn a Drive error page into a readable message"""
+        lowered = page_html.lower()
+        if 'quota' in lowered or 'too many users' in lowered:
+            return "Google Drive download quota exceeded for this file"
+        if 'accounts.google.com' in lowered or 'sign in' in lowered:
+            return "File is not publicly shared (sign-in required)"
+        return "Could not find the download link on the Google Drive page"
+
+    async def open_download(self, session, url, headers=None, max_hops=3):
+        """Follow Drive's interstitial pages until the file response itself is reached"""
+        for _ in range(max_hops):
+            response = await session.get(url, headers=headers, allow_redirects=True)
+            if response.status >= 400:
+                response.release()
+                raise DriveHTTPError(f"Google Drive returned HTTP {response.status}", response.status)
+
+            if self.is_file_response(response):
+                return response
+
+            page_html = (await response.content.read(MAX_INTERSTITIAL_BYTES)).decode('utf-8', errors='replace')
+            page_url = str(response.url)
+            response.release()
+
+            cookies = {c.key: c.value for c in session.cookie_jar}
+            next_url = self.find_confirm_url(page_html, page_url, cookies)
+            if not next_url or next_url == url:
+                raise DriveHTTPError(self.describe_error_page(page_html))
+            url = next_url
+
+        raise DriveHTTPError("Too many Google Drive interstitial pages")
+
+    async def iter_body(self, response, throttle=None):
+        """Response body in chunks, turning a read that times out into DownloadStalled.
+
+        With a ``throttle``, each chunk waits for network budget before the
+        next read, so the socket buffer fills and TCP slows the sender.
+        """
+        try:
+            async for chunk in response.content.iter_chunked(self.chunk_size):
+                if throttle is not None:
+                    await throttle.network(len(chunk))
+                yield chunk
+        except asyncio.TimeoutError:
+            raise DownloadStalled(f"No data received for {self.stall_timeout}s")
+
+    async def write_chunk(self, f, chunk, hasher=None, throttle=None):
+        """Write a chunk, hashing it concurrently when a hasher is given"""
+        if throttle is not None:
+            await throttle.disk(len(chunk))
+        if hasher is None:
+            await f.write(chunk)
+        else:
+            await asyncio.gather(f.write(chunk), hasher.update_async(chunk))
+
+    async def reserve(self, f, dest_path, size):
+        """Check free space for and preallocate a freshly opened file of known size"""
+        ensure_free_space(os.path.dirname(os.path.abspath(dest_path)), size)
+        await asyncio.get_event_loop().run_in_executor(None, preallocate, f.fileno(), size)
+
+    async def stream_to_file(self, response, dest_path, progress_callback=None, hasher=None, throttle=None, stats=None):
+        """Write a response body to disk chunk by chunk, returning the byte count"""
+        tracker = ProgressTracker(response.content_length, progress_callback, stats=stats)
+        if hasher:
+            # Written from byte 0, anything hashed by an earlier attempt is stale
+            hasher.reset()
+        async with aiofiles.open(dest_path, 'wb') as f:
+            if response.content_length:
+                await self.reserve(f, dest_path, response.content_length)
+            async for chunk in self.iter_body(response, throttle):
+                await self.write_chunk(f, chunk, hasher, throttle)
+                tracker.add(len(chunk))
+        return tracker.done
+
+    def accepts_ranges(self, response):
+        """Whether the server can serve byte ranges of a file of known size"""
+        return (
+            response.content_length is not None
+            and response.headers.get('Accept-Ranges', '').lower() == 'bytes'
+        )
+
+    def plan_segments(self, missing, total):
+        """Split the missing ranges into segments, one per connection for large files"""
+        if self.connections > 1 and total >= self.parallel_threshold:
+            segment_size = -(-total // self.connections)
+        else:
+            segment_size = total
+        segments = []
+        for start, end in missing:
+            for seg_start in range(start, end + 1, segment_size):
+                segments.append((seg_start, min(seg_start + segment_size, end + 1) - 1))
+        return segments
+
+    async def prepare_partial(self, dest_path, file_id, response):
+        """Reuse a matching partial download, or preallocate a fresh one with a new manifest.
+
+        Space for the whole file is reserved up front, so running out of disk
+        fails here rather than part-way through.
+        """
+        total = response.content_length
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+
+        manifest = PartialManifest.load(dest_path)
+        if manifest and manifest.matches(file_id, total, etag, last_modified):
+            return manifest
+
+        if manifest:
+            print("⚠️ Partial download does not match the remote file, starting over")
+        manifest = PartialManifest(dest_path, file_id, total, etag=etag, last_modified=last_modified)
+        async with aiofiles.open(dest_path, 'wb') as f:
+            await self.reserve(f, dest_path, total)
+        manifest.save()
+        return manifest
+
+    async def write_segment(self, response, dest_path, start, end, tracker, manifest, hasher=None, throttle=None,
+                            stop_at_end=False):
+        """Write a response body at ``start`` in the partial file, checkpointing the manifest.
+
+        ``stop_at_end`` is for a body that runs past ``end`` (the un-ranged
+        response reused for segment 0): reading stops once the segment is full.
+        """
+        expected = end - start + 1
+        received = 0
+        recorded = 0
+        try:
+            async with aiofiles.open(dest_path, 'r+b') as f:
+                await f.seek(start)
+                async for chunk in self.iter_body(response, throttle):
+                    if received + len(chunk) > expected:
+                        if not stop_at_end:
+                            raise DriveHTTPError(f"Range {start}-{end} returned more data than requested")
+                        chunk = chunk[:expected - received]
+                    await self.write_chunk(f, chunk, hasher, throttle)
+                    received += len(chunk)
+                    tracker.add(len(chunk))
+                    if received - recorded >= CHECKPOINT_BYTES:
+                        await f.flush()
+                        manifest.add_range(start, start + received - 1)
+                        manifest.save()
+                        recorded = received
+                    if stop_at_end and received == expected:
+                        break
+        finally:
+            # Runs on errors and cancellation too, so a retry resumes from here
+            if received > recorded:
+                manifest.add_range(start, start + received - 1)
+                manifest.save()
+        if received != expected:
+            raise DriveHTTPError(f"Range {start}-{end} truncated: got {received} of {expected} bytes")
+
+    async def fetch_range(self, session, url, dest_path, start, end, tracker, manifest, throttle=None):
+        """Fetch one byte range and write it at its offset in the preallocated file"""
+        headers = {'Range': f"bytes={start}-{end}"}
+        validator = manifest.etag or manifest.last_modified
+        if validator:
+            headers['If-Range'] = validator
+        async with session.get(url, headers=headers) as response:
+            if response.status != 206:
+                raise DriveHTTPError(f"Range request for bytes {start}-{end} returned HTTP {response.status}", response.status)
+            await self.write_segment(response, dest_path, start, end, tracker, manifest, throttle=throttle)
+
+    async def download_ranges(self, session, response, dest_path, manifest, progress_callback=None, hasher=None,
+                              throttle=None, stats=None):
+        """Fetch the missing ranges of a partial file, over several connections if it is large.
+
+        Only a fresh download's first segment is written in order from byte 0,
+        so that is the prefix ``hasher`` sees inline.
+        """
+        total = manifest.size
+        segments = self.plan_segments(manifest.missing_ranges(), total)
+        tracker = ProgressTracker(total, progress_callback, segments=min(len(segments), self.connections), stats=stats)
+        tracker.done = manifest.completed_bytes
+        if tracker.done:
+            print(f"↩️ Resuming download at {tracker.done}/{total} bytes")
+        if len(segments) > 1:
+            print(f"⚡ Fetching {total - tracker.done} bytes in {len(segments)} parallel ranges")
+
+        # A fresh download streams its first segment from the response already open
+        first_segment = None
+        if segments and segments[0][0] == 0 and tracker.done == 0:
+            first_segment = segments.pop(0)
+            if hasher:
+                hasher.reset()
+        else:
+            response.release()
+
+        url = str(response.url)
+        slots = asyncio.Semaphore(self.connections)
+
+        async def fetch(start, end):
+            async with slots:
+                await self.fetch_range(session, url, dest_path, start, end, tracker, manifest, throttle)
+
+        async def fetch_first(start, end):
+            async with slots:
+                try:
+                    await self.write_segment(
+                        response, dest_path, start, end, tracker, manifest, hasher, throttle, stop_at_end=True
+                    )
+                finally:
+                    # The rest of the body belongs to other segments, drop the connection instead of draining it
+                    response.close()
+
+        tasks = [asyncio.ensure_future(fetch(start, end)) for start, end in segments]
+        if first_segment is not None:
+            tasks.insert(0, asyncio.ensure_future(fetch_first(*first_segment)))
+        try:
+            await asyncio.gather(*tasks)
+        except Exception as e:
+            raise DownloadInterrupted(
+                f"Download interrupted at {manifest.completed_bytes}/{total} bytes, retry to resume: {e}"
+            ) from e
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        if manifest.missing_ranges():
+            raise DownloadInterrupted(f"Download incomplete at {manifest.completed_bytes}/{total} bytes, retry to resume")
+        manifest.delete()
+        return total
+
+    async def download(self, file_id, dest_path, progress_callback=None, url=None, cookies=None, hasher=None, stats=None,
+                       throttle=None):
+        """Download a Drive file to ``dest_path``, returning (suggested_filename, size).
+
+        ``hasher`` is fed the file's bytes in order as far as they are written
+        sequentially; check its ``bytes_hashed`` against the size afterwards.
+        A ``stats`` dict accumulates over calls, so it can be shared by the
+        attempts of a retried download: ``ttfb`` of the latest response, and
+        the total ``transfer`` seconds and ``bytes`` received, failed attempts
+        included.
+        A ``throttle`` (rate_limit.JobThrottle) meters network reads and disk writes.
+        """
+        url = url or self.download_url.format(file_id=file_id)
+        started = time.monotonic()
+        async with self.open_session(cookies) as session:
+            if progress_callback:
+                progress_callback("Connecting to Google Drive...", 25)
+            response = await self.open_download(session, url)
+            first_byte = time.monotonic()
+            if stats is not None:
+                stats['ttfb'] = first_byte - started
+                stats.setdefault('bytes', 0)
+            try:
+                suggested_filename = response.content_disposition.filename if response.content_disposition else None
+                if progress_callback:
+                    progress_callback("Download started...", 30)
+                if self.accepts_ranges(response):
+                    manifest = await self.prepare_partial(dest_path, file_id, response)
+                    size = await self.download_ranges(
+                        session, response, dest_path, manifest, progress_callback, hasher, throttle, stats
+                    )
+                else:
+                    PartialManifest.discard(dest_path)
+                    size = await self.stream_to_file(response, dest_path, progress_callback, hasher, throttle, stats)
+            finally:
+                response.release()
+                if stats is not None:
+                    stats['transfer'] = stats.get('transfer', 0) + time.monotonic() - first_byte
+
+        if response.content_length is not None and size != response.content_length:
+            raise DriveHTTPError(f"Download truncated: got {size} of {response.content_length} bytes")
+        return suggested_filename, size
+
+    async def probe(self, file_id):
+        """Resolve a file's download and return its size in bytes (None if unknown) without fetching it"""
+        async with self.open_session() as session:
+            response = await self.open_download(session, self.download_url.format(file_id=file_id))
+            response.release()
+            return response.content_length
+
+    async def close(self):
+        if self._connector is not None and not self._connector.closed:
+            await self._connector.close()
+        self._connector = None
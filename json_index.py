@@ -0,0 +1,59 @@
+import os
+import json
+import threading
+from pathlib import Path
+from contextlib import contextmanager
+from .file_lock import FileLock
+
+INDEX_LOCK_POLL_INTERVAL = 0.05
+
+class JsonIndex:
+    """JSON object on disk shared by threads and by ComfyUI processes using the same directory.
+
+    Reads reuse the parsed copy until another process rewrites the file.
+    Changes are made inside ``locked()``, which holds a lock file and starts
+    from a fresh read, so concurrent writers keep each other's entries.
+    """
+
+    def __init__(self, index_path, lock_path=None):
+        self.index_path = Path(index_path)
+        self._lock = threading.Lock()
+        self._file_lock = FileLock(lock_path or self.index_path.with_name(self.index_path.name + '.lock'), INDEX_LOCK_POLL_INTERVAL)
+        self._entries = None
+        self._index_mtime = None
+
+    def _index_stamp(self):
+        try:
+            return os.stat(self.index_path).st_mtime_ns
+        except OSError:
+            return None
+
+    def _load(self, refresh=False):
+        stamp = self._index_stamp()
+        if refresh or self._entries is None or stamp != self._index_mtime:
+            try:
+                with open(self.index_path, 'r', encoding='utf-8') as f:
+                    self._entries = json.load(f)
+            except (OSError, ValueError):
+                self._entries = {}
+            self._index_mtime = stamp
+        return self._entries
+
+    def get(self, key):
+        with self._lock:
+            return self._load().get(key)
+
+    @contextmanager
+    def locked(self):
+        """Yield the freshly read entries for a read-modify-write; call ``save()`` to keep changes"""
+        with self._lock, self._file_lock:
+            yield self._load(refresh=True)
+
+    def save(self):
+        """Write the entries out; only call this inside ``locked()``"""
+        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.index_path.with_name(self.index_path.name + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._entries, f)
+        os.replace(tmp_path, self.index_path)
+        self._index_mtime = self._index_stamp()
@@ -0,0 +1,186 @@
+import bisect
+import threading
+import time
+
+DURATION_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+THROUGHPUT_BUCKETS = tuple(2 ** power for power in range(16, 31, 2))  # 64 KiB/s .. 1 GiB/s
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(key, extra=None):
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value):
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Counter:
+    """Monotonic count per label set"""
+
+    kind = "counter"
+
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help = help_text
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, key, value) for key, value in self._values.items()]
+
+    def to_dict(self):
+        with self._lock:
+            return [{"labels": dict(key), "value": value} for key, value in self._values.items()]
+
+
+class Gauge(Counter):
+    """Point-in-time value per label set"""
+
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[_label_key(labels)] = value
+
+
+class Histogram:
+    """Cumulative bucket counts, sum and count per label set, as Prometheus expects them"""
+
+    kind = "histogram"
+
+    def __init__(self, name, help_text, buckets=DURATION_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._series.setdefault(key, {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0})
+            index = bisect.bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                series["counts"][index] += 1
+            series["sum"] += value
+            series["count"] += 1
+
+    def samples(self):
+        samples = []
+        with self._lock:
+            for key, series in self._series.items():
+                cumulative = 0
+                for bound, count in zip(self.buckets, series["counts"]):
+                    cumulative += count
+                    samples.append((f"{self.name}_bucket", key, cumulative, ("le", _format_value(bound))))
+                samples.append((f"{self.name}_bucket", key, series["count"], ("le", "+Inf")))
+                samples.append((f"{self.name}_sum", key, series["sum"]))
+                samples.append((f"{self.name}_count", key, series["count"]))
+        return samples
+
+    def to_dict(self):
+        with self._lock:
+            return [
+                {
+                    "labels": dict(key),
+                    "count": series["count"],
+                    "sum": series["sum"],
+                    "mean": series["sum"] / series["count"] if series["count"] else None,
+                    "buckets": dict(zip((_format_value(bound) for bound in self.buckets), series["counts"])),
+                }
+                for key, series in self._series.items()
+            ]
+
+
+class DownloaderMetrics:
+    """Counters and histograms for downloads and their stages, rendered as Prometheus text or JSON"""
+
+    def __init__(self, prefix="gdrive"):
+        self.prefix = prefix
+        self.started_at = time.time()
+        self._metrics = []
+        self.downloads = self.counter("downloads_total", "Finished downloads by result")
+        self.failures = self.counter("failures_total", "Failed downloads by cause")
+        self.retries = self.counter("retries_total", "Retried download stages")
+        self.cache_hits = self.counter("cache_hits_total", "Downloads served from the download cache")
+        self.cache_misses = self.counter("cache_misses_total", "Downloads not found in the download cache")
+        self.bytes = self.counter("bytes_total", "Bytes delivered, by source (http, browser or cache)")
+        self.browser_launch = self.histogram("browser_launch_seconds", "Time to launch Chromium")
+        self.ttfb = self.histogram("ttfb_seconds", "Time from request to the file response, by engine")
+        self.throughput = self.histogram("throughput_bytes_per_second", "Transfer throughput", THROUGHPUT_BUCKETS)
+        self.stage_duration = self.histogram("stage_duration_seconds", "Duration of download stages, by stage")
+        self.download_duration = self.histogram("download_duration_seconds", "Total duration of downloads")
+        self.queue_depth = self.gauge("queue_depth", "Jobs waiting in the download queue")
+        self.running_jobs = self.gauge("running_jobs", "Jobs currently running")
+        self.active_transfers = self.gauge("active_transfers", "File transfers currently in flight")
+
+    def _register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, help_text):
+        return self._register(Counter(f"{self.prefix}_{name}", help_text))
+
+    def gauge(self, name, help_text):
+        return self._register(Gauge(f"{self.prefix}_{name}", help_text))
+
+    def histogram(self, name, help_text, buckets=DURATION_BUCKETS):
+        return self._register(Histogram(f"{self.prefix}_{name}", help_text, buckets))
+
+    def record_job(self, timings, result):
+        """Fold one finished download's stage timings and outcome into the shared metrics"""
+        for stage, seconds in timings.items():
+            if stage == "total":
+                self.download_duration.observe(seconds)
+            elif stage != "ttfb":
+                self.stage_duration.observe(seconds, stage=stage)
+        self.downloads.inc(result="success" if result.get("success") else "failure")
+
+    def render_prometheus(self):
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for sample in metric.samples():
+                name, key, value = sample[:3]
+                extra = sample[3] if len(sample) > 3 else None
+                lines.append(f"{name}{_format_labels(key, extra)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+    def to_dict(self):
+        data = {"uptime_seconds": time.time() - self.started_at}
+        for metric in self._metrics:
+            data[metric.name[len(self.prefix) + 1:]] = metric.to_dict()
+        return data
+
+
+class StageTimer:
+    """Context manager adding its block's duration to ``timings[name]``"""
+
+    def __init__(self, timings, name):
+        self.timings = timings
+        self.name = name
+
+    def __enter__(self):
+        self._start = time.monotonic()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.timings is not None:
+            self.timings[self.name] = self.timings.get(self.name, 0) + time.monotonic() - self._start
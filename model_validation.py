@@ -0,0 +1,165 @@
+import io
+import json
+import pickle
+import struct
+import zipfile
+from collections import OrderedDict
+from pathlib import Path
+
+MODEL_EXTENSIONS = ('.pth', '.pt', '.ckpt', '.safetensors', '.gguf')
+
+SAFETENSORS_MAX_HEADER = 100 * 1024 * 1024
+TORCH_MAX_PICKLE = 256 * 1024 * 1024
+TORCH_LEGACY_MAGIC = 0x1950a86a20f9469cfc6c
+GGUF_MAGIC = b'GGUF'
+
+# Globals a state-dict pickle may reference; anything else is rejected, never imported
+ALLOWED_PICKLE_MODULES = ('torch', 'numpy', '_codecs', 'pytorch_lightning', 'lightning')
+
+
+class ValidationError(Exception):
+    """Raised when a model file is malformed"""
+
+
+class _PickleStub:
+    """Placeholder for a torch/numpy object referenced by a checkpoint pickle"""
+
+    def __init__(self, *args, **kwargs):
+        self.args = args
+
+    def __setstate__(self, state):
+        self.state = state
+
+    def __setitem__(self, key, value):
+        pass
+
+
+class _RestrictedUnpickler(pickle.Unpickler):
+    """Unpickles checkpoint structure without importing or running anything.
+
+    Allowed globals become inert stubs and tensor storages are replaced by
+    their storage keys, so no tensor data is read or materialized.
+    """
+
+    def __init__(self, file, **kwargs):
+        super().__init__(file, **kwargs)
+        self.storage_keys = set()
+
+    def find_class(self, module, name):
+        if module == 'collections' and name == 'OrderedDict':
+            return OrderedDict
+        if module == 'builtins' and name in ('set', 'frozenset', 'tuple', 'list', 'dict', 'slice', 'bytearray'):
+            return getattr(__import__('builtins'), name)
+        if module.split('.')[0] in ALLOWED_PICKLE_MODULES:
+            return type(name, (_PickleStub,), {'__module__': module})
+        raise pickle.UnpicklingError(f"Disallowed global in checkpoint: {module}.{name}")
+
+    def persistent_load(self, pid):
+        # ('storage', storage_type, key, location, numel)
+        if isinstance(pid, tuple) and len(pid) >= 3 and pid[0] == 'storage':
+            self.storage_keys.add(str(pid[2]))
+        return _PickleStub(pid)
+
+
+def describe_object(obj):
+    if isinstance(obj, dict):
+        return f"checkpoint with keys: {list(obj.keys())[:5]}..."
+    return f"model object ({type(obj).__name__})"
+
+
+def validate_safetensors(path):
+    """Check the safetensors header against the file size without reading tensor data"""
+    file_size = path.stat().st_size
+    with open(path, 'rb') as f:
+        prefix = f.read(8)
+        if len(prefix) != 8:
+            raise ValidationError("File too small to be safetensors")
+        header_size = struct.unpack('<Q', prefix)[0]
+        if header_size > SAFETENSORS_MAX_HEADER or 8 + header_size > file_size:
+            raise ValidationError(f"Invalid safetensors header size: {header_size}")
+        try:
+            header = json.loads(f.read(header_size))
+        except ValueError as e:
+            raise ValidationError(f"Unreadable safetensors header: {e}")
+
+    data_size = file_size - 8 - header_size
+    tensors = {k: v for k, v in header.items() if k != '__metadata__'}
+    data_end = 0
+    for name, info in tensors.items():
+        try:
+            start, end = info['data_offsets']
+        except (KeyError, TypeError, ValueError):
+            raise ValidationError(f"Tensor {name} has no data offsets")
+        if not 0 <= start <= end <= data_size:
+            raise ValidationError(f"Tensor {name} lies outside the file (truncated download?)")
+        data_end = max(data_end, end)
+    if data_end != data_size:
+        raise ValidationError(f"Tensor data ends at {data_end} but file holds {data_size} bytes")
+    return f"safetensors file with {len(tensors)} tensors"
+
+
+def validate_torch_zip(path):
+    """Inspect a torch zip checkpoint's central directory and data.pkl"""
+    try:
+        archive = zipfile.ZipFile(path, 'r')
+    except zipfile.BadZipFile as e:
+        raise ValidationError(f"Corrupt torch zip archive: {e}")
+    with archive:
+        names = archive.namelist()
+        pickles = [name for name in names if name.endswith('data.pkl')]
+        if not pickles:
+            raise ValidationError("Zip archive is not a PyTorch checkpoint (no data.pkl)")
+        pkl_name = pickles[0]
+        if archive.getinfo(pkl_name).file_size > TORCH_MAX_PICKLE:
+            raise ValidationError("data.pkl is unreasonably large")
+        prefix = pkl_name[:-len('data.pkl')]
+
+        unpickler = _RestrictedUnpickler(io.BytesIO(archive.read(pkl_name)))
+        try:
+            obj = unpickler.load()
+        except Exception as e:
+            raise ValidationError(f"Unreadable checkpoint pickle: {e}")
+
+        available = set(names)
+        missing = [key for key in unpickler.storage_keys if f"{prefix}data/{key}" not in available]
+        if missing:
+            raise ValidationError(f"{len(missing)} tensor storages missing from archive")
+    return f"PyTorch {describe_object(obj)}"
+
+
+def validate_torch_legacy(path):
+    """Check the magic number at the start of a pre-1.6 torch.save file"""
+    with open(path, 'rb') as f:
+        try:
+            magic = _RestrictedUnpickler(f).load()
+        except Exception as e:
+            raise ValidationError(f"Not a PyTorch file: {e}")
+    if magic != TORCH_LEGACY_MAGIC:
+        raise ValidationError("Pickle file without the PyTorch magic number")
+    return "legacy PyTorch checkpoint"
+
+
+def validate_model_file(file_path):
+    """Validate a model file without loading it, returning a short description.
+
+    Raises ValidationError if the file is malformed. Memory use is bounded by
+    the size of the file's metadata, never by its tensor data.
+    """
+    path = Path(file_path)
+    with open(path, 'rb') as f:
+        head = f.read(8)
+
+    if path.suffix.lower() == '.safetensors':
+        return validate_safetensors(path)
+    if head.startswith(b'PK'):
+        return validate_torch_zip(path)
+    if head.startswith(GGUF_MAGIC):
+        return "GGUF file"
+    if head[:1] == b'\x80':
+        return validate_torch_legacy(path)
+    raise ValidationError(f"Unrecognized model file format (starts with {head[:4]!r})")
+
+
+def is_model_file(filename):
+    """Check if the filename has a model file extension we can validate"""
+    return str(filename).lower().endswith(MODEL_EXTENSIONS)
@@ -0,0 +1,95 @@
+import re
+import time
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+class StageCancelled(Exception):
+    """Raised inside a stage when its job has been cancelled"""
+
+
+class StageContext:
+    """Handed to a stage running in a worker thread to report progress and poll for cancellation"""
+
+    def __init__(self, loop, name, start, end, progress_callback=None):
+        self.loop = loop
+        self.name = name
+        self.start = start
+        self.end = end
+        self.progress_callback = progress_callback
+        self.cancel_event = threading.Event()
+
+    def check(self):
+        """Raise StageCancelled if the job was cancelled; call this between chunks of work"""
+        if self.cancel_event.is_set():
+            raise StageCancelled(f"{self.name} cancelled")
+
+    def report(self, fraction, message=None):
+        """Report progress within the stage as a fraction between 0 and 1"""
+        if self.progress_callback is None:
+            return
+        percentage = self.start + (self.end - self.start) * max(0.0, min(fraction, 1.0))
+        # Progress callbacks touch event-loop state, so hop back onto the loop
+        self.loop.call_soon_threadsafe(self.progress_callback, message or f"{self.name}...", percentage)
+
+
+def stage_key(name):
+    """Stage name as a timings key: "Extracting zip file" becomes ``extracting_zip_file``"""
+    return re.sub(r'[^a-z0-9]+', '_', name.lower()).strip('_')
+
+
+class PostProcessPipeline:
+    """Runs blocking post-download stages (zip handling, moves, validation) in bounded thread pools.
+
+    Stages that may move gigabytes (hashing, copies, extraction) share a
+    small pool so they do not fight over the disk. Quick metadata stages
+    (``light=True``) get a pool of their own, so they never queue behind
+    those. Each stage reports its own progress range. If the awaiting job is
+    cancelled, the running stage is signalled through its StageContext and
+    awaited before the cancellation propagates, so no file is left half
+    written by a thread nobody is waiting for.
+    """
+
+    def __init__(self, max_workers=2, light_workers=4):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="gdrive-postprocess")
+        self.light_executor = ThreadPoolExecutor(max_workers=light_workers, thread_name_prefix="gdrive-metadata")
+
+    async def run_stage(self, name, func, *args, start=None, end=None, progress_callback=None, with_context=False, timings=None,
+                        light=False, **kwargs):
+        """Run ``func(*args, **kwargs)`` in a pool; ``with_context`` also passes ``stage=StageContext``.
+
+        ``light`` stages only touch metadata or small files and run on the
+        separate pool for quick work.
+
+        If ``timings`` is a dict, the stage's duration is added to it under ``stage_key(name)``.
+        """
+        loop = asyncio.get_event_loop()
+        start = start if start is not None else 0
+        end = end if end is not None else start
+        context = StageContext(loop, name, start, end, progress_callback)
+        if progress_callback:
+            progress_callback(f"{name}...", start)
+        if with_context:
+            kwargs['stage'] = context
+
+        started = time.monotonic()
+        executor = self.light_executor if light else self.executor
+        future = loop.run_in_executor(executor, functools.partial(func, *args, **kwargs))
+        try:
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            context.cancel_event.set()
+            try:
+                await future
+            except Exception:
+                pass
+            raise
+        finally:
+            if timings is not None:
+                key = stage_key(name)
+                timings[key] = timings.get(key, 0) + time.monotonic() - started
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False)
+        self.light_executor.shutdown(wait=False)
@@ -0,0 +1,104 @@
+import asyncio
+import time
+
+TERMINAL_STATUSES = ("completed", "error")
+
+class ProgressReporter:
+    """Publishes download progress to the progress store and pushes it to clients.
+
+    Updates are merged into the session's entry rather than replacing it, so
+    byte counts survive message-only updates. Pushes go through ``send``
+    (ComfyUI's websocket) at most every ``min_interval`` seconds per session;
+    updates in between are coalesced and the latest one is flushed when the
+    interval ends. Status changes are pushed immediately, and terminal states
+    are kept for ``ttl`` seconds so late polls still see the outcome.
+    """
+
+    def __init__(self, store, send=None, event="gdrive_progress", min_interval=0.25, ttl=300):
+        self.store = store
+        self.send = send
+        self.event = event
+        self.min_interval = min_interval
+        self.ttl = ttl
+        self._last_sent = {}
+        self._flush_handles = {}
+        self._rates = {}
+
+    def _update_rate(self, session_id, entry, bytes_done, bytes_total):
+        now = time.monotonic()
+        last = self._rates.get(session_id)
+        if last is not None and now > last[0] and bytes_done >= last[1]:
+            instant = (bytes_done - last[1]) / (now - last[0])
+            previous = entry.get("throughput")
+            # Exponential moving average smooths out bursty chunk arrivals
+            entry["throughput"] = instant if previous is None else 0.3 * instant + 0.7 * previous
+        if last is None or now - last[0] >= 0.5:
+            self._rates[session_id] = (now, bytes_done)
+
+        entry["bytes_done"] = bytes_done
+        entry["bytes_total"] = bytes_total
+        throughput = entry.get("throughput")
+        if bytes_total and throughput:
+            entry["eta"] = max(0.0, (bytes_total - bytes_done) / throughput)
+
+    def publish(self, session_id, data, bytes_done=None, bytes_total=None):
+        """Merge ``data`` into the session's progress and push it to clients"""
+        if not session_id:
+            return
+        previous = self.store.get(session_id, {})
+        status_changed = previous.get("status") != data.get("status")
+        entry = dict(previous) if not status_changed or data.get("status") == "progress" else {}
+        entry.update(data)
+        entry["session_id"] = session_id
+        entry["updated_at"] = time.time()
+
+        if bytes_done is not None:
+            self._update_rate(session_id, entry, bytes_done, bytes_total)
+        elif entry.get("status") != "progress":
+            for key in ("throughput", "eta"):
+                entry.pop(key, None)
+
+        self.store[session_id] = entry
+
+        terminal = entry.get("status") in TERMINAL_STATUSES
+        if terminal:
+            self._rates.pop(session_id, None)
+            self._schedule_expiry(session_id, entry)
+
+        if status_changed or terminal:
+            self._push(session_id)
+        else:
+            self._push_throttled(session_id)
+
+    def _push(self, session_id):
+        handle = self._flush_handles.pop(session_id, None)
+        if handle is not None:
+            handle.cancel()
+        self._last_sent[session_id] = time.monotonic()
+        entry = self.store.get(session_id)
+        if entry is not None and self.send is not None:
+            try:
+                self.send(self.event, entry)
+            except Exception as e:
+                print(f"⚠️ Could not push progress update: {e}")
+
+    def _push_throttled(self, session_id):
+        if session_id in self._flush_handles:
+            return  # A flush is already pending and will send the latest entry
+        wait = self.min_interval - (time.monotonic() - self._last_sent.get(session_id, 0))
+        if wait <= 0:
+            self._push(session_id)
+        else:
+            loop = asyncio.get_event_loop()
+            self._flush_handles[session_id] = loop.call_later(wait, self._push, session_id)
+
+    def _schedule_expiry(self, session_id, entry):
+        def expire():
+            if self.store.get(session_id) is entry:
+                del self.store[session_id]
+                self._last_sent.pop(session_id, None)
+
+        try:
+            asyncio.get_event_loop().call_later(self.ttl, expire)
+        except RuntimeError:
+            pass
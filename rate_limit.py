@@ -0,0 +1,171 @@
+import math
+import time
+import asyncio
+import threading
+
+MAX_WAIT_SLICE = 0.25  # Waits are sliced so limit changes apply promptly
+BUSY_POLL_INTERVAL = 0.5
+
+def parse_rate(value):
+    """A rate from an API request in bytes/s; null or 0 means unlimited"""
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        raise ValueError(f"Invalid rate: {value!r}")
+    rate = float(value)
+    if not math.isfinite(rate):
+        raise ValueError(f"Invalid rate: {value!r}")
+    if rate < 0:
+        raise ValueError(f"Rate cannot be negative: {value!r}")
+    return rate or None
+
+
+class TokenBucket:
+    """Token bucket metering bytes at ``rate`` per second, bursting up to ``burst``.
+
+    A falsy rate means unlimited. A consumer may take a chunk as soon as the
+    bucket is not in debt, even if the chunk is bigger than what is left;
+    the debt then delays the next consumer. Usable from the event loop
+    (``consume``) and from worker threads (``consume_sync``).
+    """
+
+    def __init__(self, rate=None, burst=None):
+        self._lock = threading.Lock()
+        self.set_rate(rate, burst)
+
+    def set_rate(self, rate=None, burst=None):
+        with self._lock:
+            self.rate = rate or None
+            self.burst = burst or (rate or 0)  # One second's worth by default
+            self.tokens = self.burst
+            self._updated = time.monotonic()
+
+    def _take(self, nbytes):
+        """Take ``nbytes`` if the bucket is not in debt; otherwise return how long to wait"""
+        with self._lock:
+            if not self.rate:
+                return 0
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self.tokens >= 0:
+                self.tokens -= nbytes
+                return 0
+            return min(-self.tokens / self.rate, MAX_WAIT_SLICE)
+
+    async def consume(self, nbytes):
+        while True:
+            wait = self._take(nbytes)
+            if not wait:
+                return
+            await asyncio.sleep(wait)
+
+    def consume_sync(self, nbytes):
+        while True:
+            wait = self._take(nbytes)
+            if not wait:
+                return
+            time.sleep(wait)
+
+
+class RateLimiter:
+    """Global network and disk budgets shared by every download.
+
+    With ``yield_while_executing`` set, transfers drop to ``yield_rate``
+    bytes/s (0 pauses them) whenever ``is_busy()`` reports that ComfyUI is
+    executing a prompt, so model loading for inference is not starved.
+    """
+
+    def __init__(self, network_rate=None, disk_rate=None, yield_while_executing=False, yield_rate=0, is_busy=None):
+        self.network = TokenBucket(network_rate)
+        self.disk = TokenBucket(disk_rate)
+        self.yield_while_executing = yield_while_executing
+        self.yield_rate = yield_rate
+        self.is_busy = is_busy
+        self._yield_bucket = TokenBucket(yield_rate)
+
+    def configure(self, network_rate=..., disk_rate=..., yield_while_executing=..., yield_rate=...):
+        """Change limits at runtime; arguments left out keep their current value"""
+        if network_rate is not ...:
+            self.network.set_rate(network_rate)
+        if disk_rate is not ...:
+            self.disk.set_rate(disk_rate)
+        if yield_while_executing is not ...:
+            self.yield_while_executing = bool(yield_while_executing)
+        if yield_rate is not ...:
+            self.yield_rate = yield_rate or 0
+            self._yield_bucket.set_rate(self.yield_rate)
+
+    def yielding(self):
+        if not self.yield_while_executing or self.is_busy is None:
+            return False
+        try:
+            return bool(self.is_busy())
+        except Exception:
+            return False
+
+    def to_dict(self):
+        return {
+            "network_rate": self.network.rate,
+            "disk_rate": self.disk.rate,
+            "yield_while_executing": self.yield_while_executing,
+            "yield_rate": self.yield_rate,
+            "yielding": self.yielding(),
+        }
+
+    def job(self, network_rate=None, disk_rate=None):
+        return JobThrottle(self, network_rate, disk_rate)
+
+
+class JobThrottle:
+    """One job's own network and disk limits, applied on top of the global ones"""
+
+    def __init__(self, limiter, network_rate=None, disk_rate=None):
+        self.limiter = limiter
+        self.network_bucket = TokenBucket(network_rate)
+        self.disk_bucket = TokenBucket(disk_rate)
+
+    def configure(self, network_rate=..., disk_rate=...):
+        if network_rate is not ...:
+            self.network_bucket.set_rate(network_rate)
+        if disk_rate is not ...:
+            self.disk_bucket.set_rate(disk_rate)
+
+    def to_dict(self):
+        return {"network_rate": self.network_bucket.rate, "disk_rate": self.disk_bucket.rate}
+
+    async def _yield(self, nbytes):
+        while self.limiter.yielding():
+            if self.limiter.yield_rate:
+                await self.limiter._yield_bucket.consume(nbytes)
+                return
+            await asyncio.sleep(BUSY_POLL_INTERVAL)
+
+    def _yield_sync(self, nbytes, check=None):
+        while self.limiter.yielding():
+            if self.limiter.yield_rate:
+                self.limiter._yield_bucket.consume_sync(nbytes)
+                return
+            if check:
+                check()
+            time.sleep(BUSY_POLL_INTERVAL)
+
+    async def network(self, nbytes):
+        """Meter ``nbytes`` read from the network"""
+        await self.network_bucket.consume(nbytes)
+        await self.limiter.network.consume(nbytes)
+        await self._yield(nbytes)
+
+    async def disk(self, nbytes):
+        """Meter ``nbytes`` about to be written to disk"""
+        await self.disk_bucket.consume(nbytes)
+        await self.limiter.disk.consume(nbytes)
+
+    def disk_sync(self, nbytes, check=None):
+        """``disk`` for writers in worker threads, which have no network reads to yield on.
+
+        ``check`` is called while paused, so a cancelled stage can raise out.
+        """
+        self.disk_bucket.consume_sync(nbytes)
+        self.limiter.disk.consume_sync(nbytes)
+        self._yield_sync(nbytes, check)
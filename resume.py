@@ -0,0 +1,114 @@
+import os
+import json
+from pathlib import Path
+
+class PartialManifest:
+    """Sidecar JSON recording which byte ranges of a partial download are on disk.
+
+    Lives next to the partial file as ``<partial>.json`` and remembers the
+    source file ID plus the size and ETag/Last-Modified seen when the download
+    started, so a retry only fetches the missing ranges of the same file.
+    """
+
+    def __init__(self, partial_path, file_id, size, etag=None, last_modified=None, ranges=None):
+        self.partial_path = Path(partial_path)
+        self.file_id = file_id
+        self.size = size
+        self.etag = etag
+        self.last_modified = last_modified
+        self.ranges = []
+        for start, end in ranges or []:
+            self.add_range(start, end)
+
+    @staticmethod
+    def manifest_path(partial_path):
+        partial_path = Path(partial_path)
+        return partial_path.with_name(partial_path.name + '.json')
+
+    @classmethod
+    def load(cls, partial_path):
+        """Load the manifest for ``partial_path``, or None if missing or unreadable"""
+        try:
+            with open(cls.manifest_path(partial_path), 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            return cls(
+                partial_path,
+                data['file_id'],
+                data['size'],
+                etag=data.get('etag'),
+                last_modified=data.get('last_modified'),
+                ranges=data.get('ranges', [])
+            )
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    @classmethod
+    def exists(cls, partial_path):
+        return cls.manifest_path(partial_path).exists()
+
+    @classmethod
+    def discard(cls, partial_path):
+        """Remove the manifest so the partial file is no longer considered resumable"""
+        try:
+            cls.manifest_path(partial_path).unlink()
+        except FileNotFoundError:
+            pass
+
+    def matches(self, file_id, size, etag=None, last_modified=None):
+        """Whether the partial data belongs to the same, unchanged remote file"""
+        if self.file_id != file_id or self.size != size:
+            return False
+        if self.etag and etag and self.etag != etag:
+            return False
+        if self.last_modified and last_modified and self.last_modified != last_modified:
+            return False
+        try:
+            # The partial file is preallocated to the full size when the manifest is created
+            return self.partial_path.stat().st_size == self.size
+        except OSError:
+            return False
+
+    def add_range(self, start, end):
+        """Record the inclusive byte range [start, end] as written, merging neighbours"""
+        if end < start:
+            return
+        merged = []
+        for s, e in sorted(self.ranges + [[start, end]]):
+            if merged and s <= merged[-1][1] + 1:
+                merged[-1][1] = max(merged[-1][1], e)
+            else:
+                merged.append([s, e])
+        self.ranges = merged
+
+    @property
+    def completed_bytes(self):
+        return sum(e - s + 1 for s, e in self.ranges)
+
+    def missing_ranges(self):
+        """Inclusive byte ranges still to be fetched"""
+        missing = []
+        position = 0
+        for s, e in self.ranges:
+            if s > position:
+                missing.append((position, s - 1))
+            position = max(position, e + 1)
+        if position < self.size:
+            missing.append((position, self.size - 1))
+        return missing
+
+    def save(self):
+        """Atomically write the manifest next to the partial file"""
+        path = self.manifest_path(self.partial_path)
+        tmp_path = path.with_name(path.name + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'file_id': self.file_id,
+                'size': self.size,
+                'etag': self.etag,
+                'last_modified': self.last_modified,
+                'ranges': self.ranges
+            }, f)
+        os.replace(tmp_path, path)
+
+    def delete(self):
+        self.discard(self.partial_path)
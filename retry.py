@@ -0,0 +1,42 @@
+import asyncio
+import random
+
+class RetryPolicy:
+    """Exponential backoff for one stage of a download.
+
+    Retry ``n`` (from 1) waits ``base_delay * factor ** (n - 1)`` seconds,
+    capped at ``max_delay`` and with up to 10% jitter so parallel jobs do
+    not retry in lockstep. ``attempts`` counts the first try.
+    """
+
+    def __init__(self, attempts=3, base_delay=1.0, factor=2.0, max_delay=30.0):
+        self.attempts = max(1, attempts)
+        self.base_delay = base_delay
+        self.factor = factor
+        self.max_delay = max_delay
+
+    def delay(self, retry):
+        delay = min(self.base_delay * self.factor ** (retry - 1), self.max_delay)
+        return delay * (1 + random.uniform(0, 0.1))
+
+    async def run(self, stage, func, *args, retry_if=None, on_retry=None, **kwargs):
+        """Await ``func(*args, **kwargs)``, retrying failures ``retry_if(error)`` accepts"""
+        for attempt in range(1, self.attempts + 1):
+            try:
+                return await func(*args, **kwargs)
+            except Exception as e:
+                if attempt >= self.attempts or (retry_if is not None and not retry_if(e)):
+                    raise
+                delay = self.delay(attempt)
+                print(f"🔁 {stage} failed ({e}), retrying in {delay:.1f}s ({attempt}/{self.attempts - 1})")
+                if on_retry:
+                    on_retry(stage, attempt, delay, e)
+                await asyncio.sleep(delay)
+
+
+DEFAULT_RETRY_POLICIES = {
+    # Transient HTTP failures; an interrupted ranged download resumes where it stopped
+    "http": RetryPolicy(attempts=4, base_delay=2.0),
+    # Browser navigation and browser-driven transfers
+    "browser": RetryPolicy(attempts=2, base_delay=5.0),
+}
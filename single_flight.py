@@ -0,0 +1,64 @@
+import asyncio
+
+class SharedFetch:
+    """One download in progress that every request for the same file ID attaches to.
+
+    The fetch runs as a single task whose progress is fanned out to all
+    attached callers. Once it finishes, each caller ``claim``s the resulting
+    temp file: all but the last get their own link or copy of it, and the
+    last one takes the original after the others are done with it. If every
+    caller goes away before it finishes, the fetch is cancelled and marked
+    ``abandoned``, so new requests start a fresh fetch instead of joining
+    one that is unwinding.
+    """
+
+    def __init__(self, file_id):
+        self.file_id = file_id
+        self.task = None
+        self.listeners = []
+        self.holders = 0
+        self.abandoned = False
+        self._copies = 0
+        self._copied = asyncio.Event()
+
+    def notify(self, *args, **kwargs):
+        for listener in list(self.listeners):
+            listener(*args, **kwargs)
+
+    async def result(self, listener=None):
+        """Wait for the shared fetch; the caller must then ``claim`` or ``release``"""
+        self.holders += 1
+        if listener:
+            self.listeners.append(listener)
+        try:
+            return await asyncio.shield(self.task)
+        except BaseException:
+            self.release()
+            raise
+        finally:
+            if listener:
+                self.listeners.remove(listener)
+
+    def release(self):
+        """Detach without taking the result"""
+        self.holders -= 1
+        if not self.holders and not self.task.done():
+            self.abandoned = True
+            self.task.cancel()
+
+    async def claim(self, shared_path, private_path, copy):
+        """Return the path this caller now owns, using ``await copy(src, dest)`` if others still need the original"""
+        self.holders -= 1
+        if self.holders:
+            self._copies += 1
+            try:
+                await copy(shared_path, private_path)
+                return private_path
+            finally:
+                self._copies -= 1
+                if not self._copies:
+                    self._copied.set()
+        # Everyone else resumed before us and registered their copy; wait for them to finish
+        while self._copies:
+            await self._copied.wait()
+        return shared_path
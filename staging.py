@@ -0,0 +1,82 @@
+import os
+import errno
+import shutil
+from pathlib import Path
+
+STAGING_SUFFIX = ".partial"
+
+class InsufficientSpace(Exception):
+    """Raised when the destination filesystem cannot hold a download"""
+
+
+def staging_path(directory, name):
+    """Hidden ``.partial`` file inside ``directory``, invisible to ComfyUI's model scanner"""
+    return Path(directory) / f".{name}{STAGING_SUFFIX}"
+
+
+def ensure_free_space(directory, needed):
+    """Fail before writing anything rather than with ENOSPC part-way through"""
+    free = shutil.disk_usage(directory).free
+    if needed > free:
+        raise InsufficientSpace(f"Not enough disk space in {directory}: need {needed} bytes, {free} free")
+
+
+def preallocate(fd, size):
+    """Reserve ``size`` bytes for an open file, falling back to a sparse extend where unsupported"""
+    if size <= 0:
+        return
+    if hasattr(os, 'posix_fallocate'):
+        try:
+            os.posix_fallocate(fd, 0, size)
+            return
+        except OSError as e:
+            if e.errno == errno.ENOSPC:
+                raise InsufficientSpace(f"Not enough disk space to preallocate {size} bytes")
+            if e.errno not in (errno.EINVAL, errno.EOPNOTSUPP):
+                raise
+    os.ftruncate(fd, size)
+
+
+def fsync_path(path):
+    # Opened for writing: on Windows fsync is FlushFileBuffers, which fails with EBADF on a read-only handle
+    with open(path, 'r+b') as f:
+        os.fsync(f.fileno())
+
+
+def fsync_dir(directory):
+    # Directories cannot be opened for fsync on Windows
+    if os.name != 'posix':
+        return
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def atomic_replace(source, dest):
+    """Flush ``source`` to disk and atomically put it at ``dest``.
+
+    ``dest`` only ever appears complete. If the two are on different
+    filesystems, the data is first copied into a staging file next to
+    ``dest``.
+    """
+    source, dest = Path(source), Path(dest)
+    fsync_path(source)
+    try:
+        os.replace(source, dest)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+        staged = staging_path(dest.parent, dest.name)
+        try:
+            shutil.copyfile(source, staged)
+            fsync_path(staged)
+            os.replace(staged, dest)
+        except BaseException:
+            if staged.exists():
+                staged.unlink()
+            raise
+        source.unlink()
+    fsync_dir(dest.parent)
+    return dest
@@ -0,0 +1,41 @@
+import os
+import sys
+import types
+import tempfile
+from pathlib import Path
+
+import pytest
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+
+# pytest imports the node's __init__ (the repo root is a package), which needs
+# ComfyUI's folder_paths and server modules: use the benchmark stand-ins
+os.environ.setdefault("GDRIVE_BENCH_COMFYUI_BASE", tempfile.mkdtemp(prefix="gdrive_test_comfyui_"))
+sys.path.insert(0, str(REPO_DIR / "benchmarks" / "shims"))
+sys.path.insert(0, str(REPO_DIR / "benchmarks"))
+
+# Tests import the node's modules as gdrive_downloader.<module>
+if "gdrive_downloader" not in sys.modules:
+    package = types.ModuleType("gdrive_downloader")
+    package.__path__ = [str(REPO_DIR)]
+    sys.modules["gdrive_downloader"] = package
+
+
+@pytest.fixture
+def drive_server():
+    """Start the benchmark Drive stand-in for some StubFiles, returning ``(runner, download_url)``.
+
+    Must be awaited inside the test's event loop; call ``runner.cleanup()`` when done.
+    """
+    from aiohttp import web
+    import drive_stub
+
+    async def serve(*stubs):
+        runner = web.AppRunner(drive_stub.DriveStub(stubs).make_app(), access_log=None)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        return runner, f"http://127.0.0.1:{port}/uc?export=download&id={{file_id}}"
+
+    return serve
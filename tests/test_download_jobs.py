@@ -0,0 +1,84 @@
+import os
+import asyncio
+from pathlib import PurePosixPath
+
+import pytest
+
+pytest.importorskip("aiohttp")
+pytest.importorskip("playwright")
+
+import drive_stub
+from gdrive_downloader import google_drive_downloader as gdd
+from gdrive_downloader.http_engine import HttpDownloader
+
+FOLDER_URL = "https://drive.google.com/drive/folders/folder_test_0000000000000000000"
+
+
+def test_folder_url_through_download_job(tmp_path, drive_server, monkeypatch):
+    files = {f"folder_file_{n}".ljust(33, "0"): os.urandom(4096 + n) for n in range(2)}
+    stubs = []
+    for file_id, payload in files.items():
+        path = tmp_path / f"{file_id}.bin"
+        path.write_bytes(payload)
+        stubs.append(drive_stub.StubFile(file_id, str(path), f"{file_id}.bin"))
+
+    async def walk_folder(session, folder_id):
+        return [(file_id, PurePosixPath("sub", f"{file_id}.bin")) for file_id in files]
+
+    monkeypatch.setattr(gdd, "walk_folder", walk_folder)
+    dest = tmp_path / "models"
+
+    async def main():
+        runner, url = await drive_server(*stubs)
+        monkeypatch.setattr(gdd.google_drive_api, "http_downloader", HttpDownloader(download_url=url))
+        try:
+            # The same params /google_drive_download builds, file-only options included
+            return await gdd.run_download_job(
+                google_drive_url=FOLDER_URL, filename="", model_type="custom", custom_path=str(dest),
+                overwrite=False, auto_extract_zip=True, session_id=None, expected_sha256=None,
+                include_timings=False, throttle=gdd.google_drive_api.limiter.job()
+            )
+        finally:
+            await gdd.google_drive_api.http_downloader.close()
+            await runner.cleanup()
+
+    result = asyncio.run(main())
+
+    assert result["success"], result
+    assert result["files"]["downloaded"] == 2
+    for file_id, payload in files.items():
+        assert (dest / "sub" / f"{file_id}.bin").read_bytes() == payload
+
+
+def test_cancel_then_resubmit_starts_a_fresh_fetch(tmp_path, drive_server):
+    file_id = "cancel_resubmit_file".ljust(33, "0")
+    payload = os.urandom(2 * 1024 * 1024)
+    served = tmp_path / "served.bin"
+    served.write_bytes(payload)
+    # Slow enough that the first request is still transferring when it is cancelled
+    stub = drive_stub.StubFile(file_id, str(served), "model.bin", rate=1024 * 1024)
+    dest = tmp_path / "models"
+
+    async def main():
+        runner, url = await drive_server(stub)
+        api = gdd.GoogleDriveDownloaderAPI(cache_max_bytes=0)
+        api.http_downloader = HttpDownloader(download_url=url)
+        started = asyncio.Event()
+        try:
+            first = asyncio.ensure_future(api.download_file_async(
+                file_id, "model.bin", "custom", str(dest), on_bytes=lambda done, total: started.set()
+            ))
+            await asyncio.wait_for(started.wait(), 10)
+            first.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await first
+            # Resubmitted while the cancelled fetch may still be unwinding
+            return await asyncio.wait_for(api.download_file_async(file_id, "model.bin", "custom", str(dest)), 30)
+        finally:
+            await api.http_downloader.close()
+            await runner.cleanup()
+
+    result = asyncio.run(main())
+
+    assert result["success"], result
+    assert (dest / "model.bin").read_bytes() == payload
@@ -0,0 +1,151 @@
+import os
+import asyncio
+
+import pytest
+
+from gdrive_downloader.download_queue import DownloadQueue
+
+
+class GatedRunner:
+    """Queue runner whose jobs only finish when the test releases them"""
+
+    def __init__(self):
+        self.started = []
+        self.gates = {}
+
+    async def __call__(self, name, **params):
+        self.started.append(name)
+        self.gates[name] = asyncio.Event()
+        await self.gates[name].wait()
+        return {"success": True, "name": name}
+
+    async def finish(self, name):
+        self.gates[name].set()
+        await asyncio.sleep(0)  # Let the job wind down and the queue dispatch the next one
+        await asyncio.sleep(0)
+
+
+def test_priority_order_and_per_destination_limit():
+    async def main():
+        runner = GatedRunner()
+        queue = DownloadQueue(runner, max_concurrent=3, max_per_destination=2)
+        jobs = {
+            "a1": queue.submit({"name": "a1"}, destination="a"),
+            "a2": queue.submit({"name": "a2"}, destination="a"),
+            "a3": queue.submit({"name": "a3"}, destination="a", priority=5),
+            "b1": queue.submit({"name": "b1"}, destination="b"),
+            "low": queue.submit({"name": "low"}, destination="c", priority=-1),
+            "high": queue.submit({"name": "high"}, destination="c", priority=1),
+        }
+        await asyncio.sleep(0)
+
+        # "a" is saturated after two jobs, which does not hold up "b"
+        assert runner.started == ["a1", "a2", "b1"]
+        assert queue.running == 3 and queue.depth == 3
+        assert [job.params["name"] for job in queue.queued()] == ["a3", "high", "low"]
+        assert queue.position(jobs["a3"]) == 1
+
+        # A free slot goes to the highest priority job whose destination has room
+        await runner.finish("b1")
+        assert runner.started[-1] == "high"
+        await runner.finish("a1")
+        assert runner.started[-1] == "a3"
+        await runner.finish("a2")
+        assert runner.started[-1] == "low"
+
+        for name in ("a3", "high", "low"):
+            await runner.finish(name)
+        results = [await queue.wait(job) for job in jobs.values()]
+        assert all(result["success"] for result in results)
+        assert {job.status for job in jobs.values()} == {"completed"}
+
+    asyncio.run(main())
+
+
+def test_reorder_and_cancel_queued_jobs():
+    async def main():
+        runner = GatedRunner()
+        queue = DownloadQueue(runner, max_concurrent=1)
+        first = queue.submit({"name": "first"})
+        second = queue.submit({"name": "second"})
+        third = queue.submit({"name": "third"})
+        await asyncio.sleep(0)
+
+        assert queue.set_priority(third.job_id, 10)
+        assert not queue.set_priority(first.job_id, 10)  # Already running
+        assert queue.position(third) == 1
+
+        assert queue.cancel(second.job_id)
+        assert second.status == "cancelled"
+        assert await queue.wait(second) == {"success": False, "error": "Cancelled", "job_id": second.job_id}
+        assert not queue.cancel(second.job_id)
+
+        await runner.finish("first")
+        assert runner.started == ["first", "third"]
+        await runner.finish("third")
+        assert (await queue.wait(third))["success"]
+
+    asyncio.run(main())
+
+
+def test_cancel_running_job():
+    async def main():
+        runner = GatedRunner()
+        queue = DownloadQueue(runner, max_concurrent=1)
+        running = queue.submit({"name": "running"}, destination="a")
+        waiting = queue.submit({"name": "waiting"}, destination="a")
+        await asyncio.sleep(0)
+
+        assert queue.cancel(running.job_id)
+        result = await queue.wait(running)
+        assert running.status == "cancelled" and not result["success"]
+        # The freed slot and destination go to the next job
+        await asyncio.sleep(0)
+        assert runner.started == ["running", "waiting"]
+        await runner.finish("waiting")
+        assert waiting.status == "completed"
+
+    asyncio.run(main())
+
+
+def test_queued_downloads_from_stand_in_drive(tmp_path, drive_server):
+    pytest.importorskip("aiohttp")
+    pytest.importorskip("playwright")
+    import drive_stub
+    from gdrive_downloader import google_drive_downloader as gdd
+    from gdrive_downloader.http_engine import HttpDownloader
+
+    payloads = {f"queued_file_{n}".ljust(33, "0"): os.urandom(64 * 1024 + n) for n in range(3)}
+    stubs = []
+    for file_id, payload in payloads.items():
+        path = tmp_path / f"{file_id}.src"
+        path.write_bytes(payload)
+        stubs.append(drive_stub.StubFile(file_id, str(path), f"{file_id}.bin"))
+    dest = tmp_path / "models"
+
+    async def main():
+        runner, url = await drive_server(*stubs)
+        api = gdd.GoogleDriveDownloaderAPI(cache_max_bytes=0)
+        api.http_downloader = HttpDownloader(download_url=url)
+        try:
+            queue = DownloadQueue(api.download_file_async, max_concurrent=1)
+            jobs = [
+                queue.submit({"google_drive_url": file_id, "filename": f"{file_id}.bin", "model_type": "custom", "custom_path": str(dest)},
+                             destination=str(dest))
+                for file_id in payloads
+            ]
+            # Still queued behind the first job
+            assert queue.cancel(jobs[1].job_id)
+            return [await queue.wait(job) for job in jobs]
+        finally:
+            await api.http_downloader.close()
+            await runner.cleanup()
+
+    results = asyncio.run(main())
+
+    assert [result["success"] for result in results] == [True, False, True]
+    assert results[1]["error"] == "Cancelled"
+    file_ids = list(payloads)
+    assert (dest / f"{file_ids[0]}.bin").read_bytes() == payloads[file_ids[0]]
+    assert not (dest / f"{file_ids[1]}.bin").exists()
+    assert (dest / f"{file_ids[2]}.bin").read_bytes() == payloads[file_ids[2]]
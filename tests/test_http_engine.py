@@ -0,0 +1,45 @@
+import os
+import asyncio
+
+import pytest
+
+pytest.importorskip("aiohttp")
+
+import drive_stub
+from gdrive_downloader.http_engine import HttpDownloader
+from gdrive_downloader.checksums import StreamHasher
+
+FILE_ID = "parallel_test_file_0000000000000000"
+SIZE = 3 * 1024 * 1024 + 123
+
+
+def test_parallel_download_reuses_first_response_without_retry(tmp_path, drive_server):
+    payload = os.urandom(SIZE)
+    served = tmp_path / "served.bin"
+    served.write_bytes(payload)
+    stub = drive_stub.StubFile(FILE_ID, str(served), "model.bin")
+    dest = tmp_path / "download.bin"
+
+    async def main():
+        runner, url = await drive_server(stub)
+        downloader = HttpDownloader(chunk_size=64 * 1024, parallel_threshold=1024 * 1024, connections=4, download_url=url)
+        hasher = StreamHasher(("sha256",))
+        stats = {}
+        try:
+            # No RetryPolicy around this: the first attempt has to succeed
+            result = await downloader.download(FILE_ID, dest, hasher=hasher, stats=stats)
+        finally:
+            await downloader.close()
+            await runner.cleanup()
+        return result, hasher, stats
+
+    (filename, size), hasher, stats = asyncio.run(main())
+
+    assert filename == "model.bin"
+    assert size == SIZE
+    assert dest.read_bytes() == payload
+    # One un-ranged request whose body serves segment 0, plus one Range request per other segment
+    assert stub.requests == 4
+    assert stats["bytes"] == SIZE
+    # Segment 0 was hashed inline, in full
+    assert hasher.bytes_hashed == -(-SIZE // 4)
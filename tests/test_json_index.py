@@ -0,0 +1,43 @@
+import os
+import threading
+
+from gdrive_downloader.checksums import HashIndex
+from gdrive_downloader.json_index import JsonIndex
+
+
+def test_writers_sharing_an_index_keep_each_others_entries(tmp_path):
+    path = tmp_path / "index.json"
+    # Separate instances stand in for separate ComfyUI processes
+    indexes = [JsonIndex(path) for _ in range(4)]
+
+    def write(index, worker):
+        for n in range(50):
+            with index.locked() as entries:
+                entries[f"{worker}-{n}"] = n
+                index.save()
+
+    threads = [threading.Thread(target=write, args=(index, worker)) for worker, index in enumerate(indexes)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    with JsonIndex(path).locked() as entries:
+        assert len(entries) == 200
+    # A reader that cached an older copy picks up the rewritten file
+    assert indexes[0].get("3-49") == 49
+
+
+def test_hash_index_entry_goes_stale_when_the_file_changes(tmp_path):
+    model = tmp_path / "model.bin"
+    model.write_bytes(b"x" * 100)
+    index = HashIndex(tmp_path / ".gdrive_hash_index.json")
+    index.record(model, {"sha256": "abc"})
+
+    entry, fresh = index.lookup(model)
+    assert fresh and entry["sha256"] == "abc"
+
+    model.write_bytes(b"x" * 50)
+    os.utime(model, ns=(0, 0))
+    assert index.lookup(model) == (entry, False)
+    assert index.lookup(tmp_path / "missing.bin") == (None, False)
@@ -0,0 +1,57 @@
+import zipfile
+
+import pytest
+
+from gdrive_downloader.model_validation import ValidationError, validate_model_file
+
+# Hand-written pickles, so the tests need neither torch nor importable torch globals.
+# A state dict {"weight": torch._utils._rebuild_tensor_v2(<storage "0">, 0)}
+STATE_DICT_PICKLE = (
+    b"\x80\x02}Vweight\n"
+    b"ctorch._utils\n_rebuild_tensor_v2\n"
+    b"((Vstorage\nctorch\nFloatStorage\nV0\nVcpu\nI4\ntQI0\ntR"
+    b"s."
+)
+
+
+def evil_pickle(marker):
+    """os.system("touch <marker>"), which must never be imported, let alone run"""
+    return b"\x80\x02cos\nsystem\n(V" + f"touch {marker}".encode() + b"\ntR."
+
+
+def write_torch_zip(path, pickle_bytes, storages=("0",)):
+    with zipfile.ZipFile(path, "w") as archive:
+        archive.writestr("archive/data.pkl", pickle_bytes)
+        for key in storages:
+            archive.writestr(f"archive/data/{key}", b"\0" * 16)
+
+
+def test_torch_zip_state_dict_is_valid(tmp_path):
+    path = tmp_path / "model.pth"
+    write_torch_zip(path, STATE_DICT_PICKLE)
+    assert validate_model_file(path) == "PyTorch checkpoint with keys: ['weight']..."
+
+
+def test_torch_zip_missing_storage_is_rejected(tmp_path):
+    path = tmp_path / "model.pth"
+    write_torch_zip(path, STATE_DICT_PICKLE, storages=())
+    with pytest.raises(ValidationError, match="storages missing"):
+        validate_model_file(path)
+
+
+def test_disallowed_global_in_torch_zip_is_rejected(tmp_path):
+    marker = tmp_path / "pwned"
+    path = tmp_path / "model.pth"
+    write_torch_zip(path, evil_pickle(marker))
+    with pytest.raises(ValidationError, match="Disallowed global in checkpoint: os.system"):
+        validate_model_file(path)
+    assert not marker.exists()
+
+
+def test_disallowed_global_in_legacy_file_is_rejected(tmp_path):
+    marker = tmp_path / "pwned"
+    path = tmp_path / "model.pt"
+    path.write_bytes(evil_pickle(marker))
+    with pytest.raises(ValidationError, match="Disallowed global in checkpoint: os.system"):
+        validate_model_file(path)
+    assert not marker.exists()
@@ -0,0 +1,52 @@
+import time
+import asyncio
+
+import pytest
+
+from gdrive_downloader.rate_limit import TokenBucket, parse_rate
+
+
+@pytest.mark.parametrize("value, expected", [(None, None), (0, None), ("0", None), (1024, 1024.0), ("2.5e6", 2.5e6)])
+def test_parse_rate_accepts(value, expected):
+    assert parse_rate(value) == expected
+
+
+@pytest.mark.parametrize("value", [-1, "-5", "fast", True, float("nan"), "NaN", float("inf"), "Infinity", "-inf"])
+def test_parse_rate_rejects(value):
+    with pytest.raises(ValueError):
+        parse_rate(value)
+
+
+def test_unlimited_bucket_never_waits():
+    bucket = TokenBucket()
+    for _ in range(1000):
+        assert bucket._take(1 << 30) == 0
+
+
+def test_bucket_meters_async_and_sync_consumers():
+    rate = 100_000
+    bucket = TokenBucket(rate)
+
+    async def consume():
+        for _ in range(10):
+            await bucket.consume(10_000)
+
+    # The first second's burst is free; the next 100 KB must wait about a second
+    started = time.monotonic()
+    asyncio.run(consume())
+    asyncio.run(consume())
+    elapsed = time.monotonic() - started
+    assert 0.7 < elapsed < 2
+
+    started = time.monotonic()
+    for _ in range(10):
+        bucket.consume_sync(10_000)
+    assert 0.7 < time.monotonic() - started < 2
+
+
+def test_set_rate_lifts_the_limit():
+    bucket = TokenBucket(10)
+    bucket.consume_sync(1000)
+    assert bucket._take(1) > 0
+    bucket.set_rate(None)
+    assert bucket._take(1) == 0
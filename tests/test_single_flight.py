@@ -0,0 +1,104 @@
+import shutil
+import asyncio
+
+import pytest
+
+from gdrive_downloader.single_flight import SharedFetch
+
+
+def start_flight(fetch):
+    flight = SharedFetch("file")
+    flight.task = asyncio.ensure_future(fetch(flight))
+    return flight
+
+
+def test_last_claimer_takes_the_original_after_the_others_copied(tmp_path):
+    shared = tmp_path / "shared.bin"
+    events = []
+
+    async def fetch(flight):
+        await asyncio.sleep(0.01)
+        flight.notify("done")
+        shared.write_bytes(b"payload")
+        return shared
+
+    async def copy(src, dest):
+        events.append(f"copy {dest.name} started")
+        await asyncio.sleep(0.05)
+        shutil.copyfile(src, dest)
+        events.append(f"copy {dest.name} finished")
+
+    async def caller(flight, name):
+        progress = []
+        path = await flight.result(progress.append)
+        owned = await flight.claim(path, tmp_path / f"{name}.bin", copy)
+        if owned == shared:
+            events.append(f"{name} took original")
+        return owned, progress
+
+    async def main():
+        flight = start_flight(fetch)
+        return await asyncio.gather(*(caller(flight, name) for name in ("a", "b", "c")))
+
+    results = asyncio.run(main())
+
+    paths = [path for path, _ in results]
+    assert paths == [tmp_path / "a.bin", tmp_path / "b.bin", shared]
+    assert all(path.read_bytes() == b"payload" for path in paths)
+    assert all(progress == ["done"] for _, progress in results)
+    # The original is only handed over once both copies are complete
+    assert events[-1] == "c took original"
+    assert events.index("copy a.bin finished") < events.index("c took original")
+    assert events.index("copy b.bin finished") < events.index("c took original")
+
+
+def test_fetch_survives_while_any_caller_remains():
+    async def fetch(flight):
+        await asyncio.sleep(0.05)
+        return "path"
+
+    async def main():
+        flight = start_flight(fetch)
+        leaving = asyncio.ensure_future(flight.result())
+        staying = asyncio.ensure_future(flight.result())
+        await asyncio.sleep(0)
+        leaving.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leaving
+        assert not flight.abandoned
+        assert await staying == "path"
+        assert flight.holders == 1
+
+    asyncio.run(main())
+
+
+def test_fetch_is_cancelled_and_abandoned_when_every_caller_leaves():
+    async def fetch(flight):
+        await asyncio.sleep(10)
+
+    async def main():
+        flight = start_flight(fetch)
+        callers = [asyncio.ensure_future(flight.result()) for _ in range(2)]
+        await asyncio.sleep(0)
+        for caller in callers:
+            caller.cancel()
+        await asyncio.gather(*callers, return_exceptions=True)
+        # Marked before the task has unwound, so no new request joins it
+        assert flight.abandoned and flight.holders == 0
+        with pytest.raises(asyncio.CancelledError):
+            await flight.task
+
+    asyncio.run(main())
+
+
+def test_release_after_result_does_not_cancel_a_finished_fetch():
+    async def fetch(flight):
+        return "path"
+
+    async def main():
+        flight = start_flight(fetch)
+        assert await flight.result() == "path"
+        flight.release()
+        assert not flight.abandoned and not flight.task.cancelled()
+
+    asyncio.run(main())
@@ -165,6 +165,15 @@ class GoogleDriveDownloader {
         this.isDownloading = false;
         this.progressInterval = null;
         this.currentSessionId = null;
+        this.lastPushAt = 0;
+
+        // Progress is pushed over ComfyUI's websocket; polling is only a fallback
+        api.addEventListener('gdrive_progress', (event) => {
+            const progress = event.detail;
+            if (!progress || progress.session_id !== this.currentSessionId) return;
+            this.lastPushAt = Date.now();
+            this.handleProgress(progress);
+        });
     }
 
     createModal() {
@@ -279,35 +288,65 @@ class GoogleDriveDownloader {
         return 'session_' + Date.now() + '_' + Math.random().toString(36).substr(2, 9);
     }
 
-    async pollProgress(sessionId) {
+    formatBytes(bytes) {
+        const units = ['B', 'KB', 'MB', 'GB', 'TB'];
+        let value = bytes;
+        let unit = 0;
+        while (value >= 1024 && unit < units.length - 1) {
+            value /= 1024;
+            unit++;
+        }
+        return `${value.toFixed(unit ? 1 : 0)} ${units[unit]}`;
+    }
+
+    formatProgressMessage(progress) {
+        let message = progress.message;
+        if (progress.throughput) {
+            message += ` - ${this.formatBytes(progress.throughput)}/s`;
+        }
+        if (progress.eta !== undefined && progress.eta !== null) {
+            const eta = Math.round(progress.eta);
+            message += `, ${Math.floor(eta / 60)}m ${eta % 60}s left`;
+        }
+        return message;
+    }
+
+    handleProgress(progress) {
         if (!this.modal || !this.isDownloading) return;
         
-        try {
-            const response = await api.fetchApi(`/google_drive_progress/${sessionId}`);
-            const progress = await response.json();
-            
-            if (progress.status === 'progress' || progress.status === 'starting') {
-                this.showProgress(progress.message, progress.percentage || 0);
-            } else if (progress.status === 'completed') {
-                this.showProgress(progress.message, 100);
-                setTimeout(() => {
-                    this.hideProgress();
-                    this.showMessage(`✅ ${progress.message}`, false);
-                    this.stopProgressPolling();
-                    
-                    // Re-enable form but keep modal open
-                    this.isDownloading = false;
-                    this.setFormEnabled(true);
-                }, 500);
-            } else if (progress.status === 'error') {
+        if (progress.status === 'progress' || progress.status === 'starting' || progress.status === 'queued') {
+            this.showProgress(this.formatProgressMessage(progress), progress.percentage || 0);
+        } else if (progress.status === 'completed') {
+            this.showProgress(progress.message, 100);
+            setTimeout(() => {
                 this.hideProgress();
-                this.showMessage(`❌ ${progress.message}`, true);
+                this.showMessage(`✅ ${progress.message}`, false);
                 this.stopProgressPolling();
                 
                 // Re-enable form but keep modal open
                 this.isDownloading = false;
                 this.setFormEnabled(true);
-            }
+            }, 500);
+        } else if (progress.status === 'error') {
+            this.hideProgress();
+            this.showMessage(`❌ ${progress.message}`, true);
+            this.stopProgressPolling();
+            
+            // Re-enable form but keep modal open
+            this.isDownloading = false;
+            this.setFormEnabled(true);
+        }
+    }
+
+    async pollProgress(sessionId) {
+        if (!this.modal || !this.isDownloading) return;
+        // Skip the poll while websocket pushes are arriving
+        if (Date.now() - this.lastPushAt < 5000) return;
+        
+        try {
+            const response = await api.fetchApi(`/google_drive_progress/${sessionId}`);
+            const progress = await response.json();
+            this.handleProgress(progress);
         } catch (error) {
             console.error('Error polling progress:', error);
         }
@@ -315,9 +354,10 @@ class GoogleDriveDownloader {
 
     startProgressPolling(sessionId) {
         this.currentSessionId = sessionId;
+        this.lastPushAt = 0;
         this.progressInterval = setInterval(() => {
             this.pollProgress(sessionId);
-        }, 500); // Poll every 500ms
+        }, 2000); // Fallback poll every 2s if no pushes arrive
     }
 
     stopProgressPolling() {